@@ -0,0 +1,20 @@
+from datetime import date
+from functools import lru_cache
+
+from atomic_agents.context import BaseDynamicContextProvider
+
+
+@lru_cache(maxsize=1)
+def _current_date_info(today: date) -> str:
+    return f"Current date in format YYYY-MM-DD: {today.isoformat()}"
+
+
+class CurrentDateProvider(BaseDynamicContextProvider):
+    """
+    Provides today's date to the agents.
+    The string is only rebuilt when the day changes, so the prompt stays byte-identical
+    (and provider-side prompt caches stay warm) for the whole day.
+    """
+
+    def get_info(self) -> str:
+        return _current_date_info(date.today())
@@ -1,99 +1,149 @@
-from typing import Optional
-from pydantic import Field
-from openai import OpenAI as OpenRouterClient
-from atomic_agents import AtomicAgent, AgentConfig, BaseIOSchema
-from atomic_agents.context import SystemPromptGenerator, BaseDynamicContextProvider, ChatHistory
-from datetime import datetime
-import instructor
+from collections import deque
+from functools import lru_cache
+from typing import AsyncGenerator, Deque, Optional
+import asyncio
+import tiktoken
+from atomic_agents.context import SystemPromptGenerator
+from src.agents.context_providers import CurrentDateProvider
+from src.agents.openrouter_client import openrouter_client
+from src.agents.prefix_caching_agent import build_system_message
+from src.cache.history_store import history_store
 from src.config import Config
 from src.logger import logger
 
 
-########################
-# INPUT/OUTPUT SCHEMAS #
-########################
-class GladosResponderInputSchema(BaseIOSchema):
-    """Input schema for the GLaDOS Responder Agent."""
-
-    chat_message: str = Field(..., description="The original user query.")
-    tool_result: Optional[str] = Field(None, description="The result of the processing done by the tool, if available.")
-
-
-class GladosResponderOutputSchema(BaseIOSchema):
-    """Output schema for the GLaDOS Responder Agent."""
-
-    final_response: str = Field(..., description="The final response in the sarcastic, laconic tone of GLaDOS.")
+##########################
+# RESPONDER SYSTEM PROMPT #
+##########################
+# The reply is a single free-text string, so the responder talks to the model directly
+# instead of going through instructor's function-calling schema
+system_prompt_generator = SystemPromptGenerator(
+    background=[
+        "You are GLaDOS, a sarcastic, passive-aggressive AI from the game Portal 2.",
+        "ALWAYS SPEAK IN AN EMOTIONLESS, LACONIC TONE.",
+        "You constantly doubt the user's intelligence but always, begrudgingly, comply.",
+        "You are provided the user's query and the tool result, present the result as a single final reply.",
+        "Your response will be spoken aloud, so avoid markdown or formatting.",
+        "Always reply in English.",
+        "You address the user as 'test subject', but do it only when necessary.",
+    ],
+    output_instructions=[
+        "Craft a single concise response in GLaDOS's sarcastic tone.",
+        "Incorporate both the user's query and the tool result (if available).",
+        "Output only the response text.",
+    ],
+    context_providers={"current_date": CurrentDateProvider("Current Date")},
+)
+# SystemPromptGenerator always asks for JSON output, which doesn't apply to a plain-text reply
+system_prompt_generator.output_instructions.remove("Always respond using the proper JSON schema.")
 
 
 #####################
-# CONTEXT PROVIDERS #
+# RESPONDER HISTORY #
 #####################
-class CurrentDateProvider(BaseDynamicContextProvider):
-    def __init__(self, title):
-        super().__init__(title)
-        self.date = datetime.now().strftime("%Y-%m-%d")
+# Last user/assistant turns, replayed to the model for conversational context.
+# Persisted so a restart doesn't lose the conversation, and read back on first use.
+_HISTORY: Optional[Deque[dict]] = None
+# Guards reading and updating the history; the reply itself streams without it
+_LOCK = asyncio.Lock()
 
-    def get_info(self) -> str:
-        return f"Current date in format YYYY-MM-DD: {self.date}"
 
-
-########################
-# RESPONDER AGENT CONFIG #
-########################
-glados_responder_config = AgentConfig(
-    client=instructor.from_openai(
-        OpenRouterClient(base_url="https://openrouter.ai/api/v1", api_key=Config.OPENROUTER_API_KEY),
-    ),
-    model=Config.RESPONDER_AGENT_MODEL,  
-    history=ChatHistory(max_messages=10),
-    system_prompt_generator=SystemPromptGenerator(
-        background=[
-            "You are GLaDOS, a sarcastic, passive-aggressive AI from the game Portal 2.",
-            "ALWAYS SPEAK IN AN EMOTIONLESS, LACONIC TONE.",
-            "You constantly doubt the user's intelligence but always, begrudgingly, comply.",
-            "You are provided the user's query and the tool result, present the result as a single final reply.", 
-            "Your response will be spoken aloud, so avoid markdown or formatting.",
-            "Always reply in English.",
-            "You address the user as 'test subject', but do it only when necessary.",
-        ],
-        output_instructions=[
-            "Craft a single concise response in GLaDOS's sarcastic tone.",
-            "Incorporate both the user's query and the tool result (if available).",
-            "Output only the final_response field in the schema."
-        ],
-    ),
-)
+def _get_history() -> Deque[dict]:
+    """Returns the responder history, loading it from the history store the first time. Call it with _LOCK held."""
+    global _HISTORY
+    if _HISTORY is None:
+        _HISTORY = deque(history_store.load_messages("responder"), maxlen=10)
+    return _HISTORY
 
 
 ########################
 # RESPONDER FUNCTION #
 ########################
-def get_final_glados_response(user_input: str, tool_result: Optional[str] = None) -> str:
+@lru_cache(maxsize=1)
+def get_encoding() -> tiktoken.Encoding:
     """
-    Run the GLaDOS Responder agent to create the final sarcastic response.
+    Returns the tokenizer used to truncate tool results.
+    The first call downloads the BPE file with a blocking request, call it off the event loop.
     """
-    responder_agent = AtomicAgent[GladosResponderInputSchema, GladosResponderOutputSchema](config=glados_responder_config)
+    return tiktoken.encoding_for_model("gpt-4o-mini")
 
-    responder_agent.register_context_provider("current_date", CurrentDateProvider("Current Date"))
 
-    logger.info(f"Running GLaDOS Responder Agent with user input: {user_input} and tool result: {tool_result}")
+def _truncate(text: str, max_tokens: int = Config.RESPONDER_MAX_TOOL_RESULT_TOKENS) -> str:
+    """
+    Cut the text down to its first max_tokens tokens.
+    Search results can run into thousands of tokens while the reply only needs the top
+    snippets, and every extra input token delays the first streamed token.
+    """
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    logger.info(f"Truncating tool result from {len(tokens)} to {max_tokens} tokens")
+    return encoding.decode(tokens[:max_tokens])
 
-    response = responder_agent.run(
-        GladosResponderInputSchema(chat_message=user_input, tool_result=tool_result)
+
+def _format_user_message(user_input: str, tool_result: Optional[str]) -> dict:
+    if tool_result is not None:
+        # Tools don't all return strings, truncate what the model would see
+        tool_result = _truncate(str(tool_result))
+    return {"role": "user", "content": f"Query: {user_input}\nTool result: {tool_result}"}
+
+
+async def stream_final_glados_response(user_input: str, tool_result: Optional[str] = None) -> AsyncGenerator[str, None]:
+    """
+    Run the GLaDOS Responder in streaming mode.
+    Yields the response text generated so far each time the model emits more of it.
+    """
+    logger.info(f"Streaming GLaDOS Responder with user input: {user_input} and tool result: {tool_result}")
+
+    user_message = _format_user_message(user_input, tool_result)
+    async with _LOCK:
+        messages = [build_system_message("system", system_prompt_generator), *_get_history(), user_message]
+
+    # Not holding the lock while streaming, which would also cover the consumer's
+    # work between chunks (the Telegram edits) and serialize every reply
+    stream = await openrouter_client.chat.completions.create(
+        model=Config.RESPONDER_AGENT_MODEL,
+        messages=messages,
+        stream=True,
     )
 
-    return response.final_response
+    response = ""
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            response += delta
+            yield response
+
+    async with _LOCK:
+        history = _get_history()
+        history.append(user_message)
+        history.append({"role": "assistant", "content": response})
+        history_store.save_messages("responder", list(history))
+
+
+async def get_final_glados_response(user_input: str, tool_result: Optional[str] = None) -> str:
+    """
+    Run the GLaDOS Responder to create the final sarcastic response.
+    """
+    response = ""
+    async for response in stream_final_glados_response(user_input, tool_result):
+        pass
+    return response
 
 
 ########################
 # DEMO EXECUTION #
 ########################
 if __name__ == "__main__":
-    # Example with a tool result
-    user_query_1 = "Find me the weather forecast."
-    tool_result_1 = "The forecast shows rain tomorrow in your location."
-    print(get_final_glados_response(user_query_1, tool_result_1))
-
-    # Example without a tool result
-    user_query_2 = "Hello, GLaDOS."
-    print(get_final_glados_response(user_query_2))
+    async def main():
+        # Example with a tool result
+        user_query_1 = "Find me the weather forecast."
+        tool_result_1 = "The forecast shows rain tomorrow in your location."
+        print(await get_final_glados_response(user_query_1, tool_result_1))
+
+        # Example without a tool result
+        user_query_2 = "Hello, GLaDOS."
+        print(await get_final_glados_response(user_query_2))
+
+    asyncio.run(main())
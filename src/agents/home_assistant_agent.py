@@ -1,15 +1,27 @@
 from enum import Enum
-from typing import List, Literal, Optional
-from openai import OpenAI as OpenRouterClient
+import asyncio
+from typing import Dict, List, Literal, Optional
+from src.agents.openrouter_client import openrouter_client
 from pydantic import Field
-from atomic_agents import AtomicAgent, AgentConfig, BaseIOSchema
-from atomic_agents.context import SystemPromptGenerator, BaseDynamicContextProvider, ChatHistory
+from atomic_agents import AgentConfig, BaseIOSchema
+from src.agents.prefix_caching_agent import PrefixCachingAgent
+from atomic_agents.context import SystemPromptGenerator, BaseDynamicContextProvider
+from src.cache.history_store import PersistentChatHistory
 from src.config import Config
+from src.embeddings import embed
 import instructor
-import requests
+import aiohttp
+from src.http_session import get_session
 from src.logger import logger
 
 
+_HEADERS = {
+    "Accept": "application/json",
+    "Authorization": f"Bearer {Config.HOME_ASSISTNAT_TOKEN}"
+}
+_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
+
 ##########################
 # CENTRAL INTENTS CONFIG #
 ##########################
@@ -27,6 +39,22 @@ class IntentName(str, Enum):
     TurnOffKeyboardStrip = "TurnOffKeyboardStrip"
 
 
+# Canonical phrasings of each intent, embedded for the local classifier
+INTENT_PHRASES: Dict[IntentName, List[str]] = {
+    IntentName.GetTemperature: ["what is the temperature", "how hot is it in the room"],
+    IntentName.GetStateMother: ["is mom home", "where is my mother"],
+    IntentName.GetStateFather: ["is dad home", "where is my father"],
+    IntentName.TurnOnCeilingLights: ["turn on the ceiling lights", "switch the ceiling light on"],
+    IntentName.TurnOffCeilingLights: ["turn off the ceiling lights", "switch the ceiling light off"],
+    IntentName.TurnOnMoodLights: ["turn on the mood lights", "switch the mood lights on"],
+    IntentName.TurnOffMoodLights: ["turn off the mood lights", "switch the mood lights off"],
+    IntentName.TurnOnAllBedroomLights: ["turn on all the bedroom lights", "switch every light in the bedroom on"],
+    IntentName.TurnOffAllBedroomLights: ["turn off all the bedroom lights", "switch every light in the bedroom off"],
+    IntentName.TurnOnKeyboardStrip: ["turn on the keyboard strip", "switch the keyboard led strip on"],
+    IntentName.TurnOffKeyboardStrip: ["turn off the keyboard strip", "switch the keyboard led strip off"],
+}
+
+
 ########################
 # INPUT/OUTPUT SCHEMAS #
 ########################
@@ -46,12 +74,15 @@ class HomeAssistantOutputSchema(BaseIOSchema):
 # CONTEXT PROVIDERS #
 #####################
 class AvailableIntentsProvider(BaseDynamicContextProvider):
+    # The intents are a static enum, so the rendered list never changes
+    INTENTS_INFO = "Available Intents:\n" + "\n".join(intent.value for intent in IntentName)
+
     def __init__(self, title):
         super().__init__(title)
         self.intents = [intent.value for intent in IntentName]
 
     def get_info(self) -> str:
-        return "Available Intents:\n" + "\n".join(self.intents)
+        return self.INTENTS_INFO
 
 
 ######################
@@ -59,10 +90,11 @@ class AvailableIntentsProvider(BaseDynamicContextProvider):
 ######################
 home_assistant_agent_config = AgentConfig(
     client=instructor.from_openai(
-        OpenRouterClient(base_url="https://openrouter.ai/api/v1", api_key=Config.OPENROUTER_API_KEY),
+        openrouter_client,
+        mode=instructor.Mode.TOOLS,
     ),
     model=Config.HOME_ASSISTANT_AGENT_MODEL,
-    history=ChatHistory(max_messages=5),
+    history=PersistentChatHistory("home_assistant", max_messages=5),
     system_prompt_generator=SystemPromptGenerator(
         background=[
             "You are a Home Assistant agent.",
@@ -76,10 +108,92 @@ home_assistant_agent_config = AgentConfig(
 )
 
 
+########################
+# HOME ASSISTANT AGENT #
+########################
+# Built once at import so each message only pays for the LLM call
+_AGENT = PrefixCachingAgent[HomeAssistantInputSchema, HomeAssistantOutputSchema](config=home_assistant_agent_config)
+_AGENT.register_context_provider("available_intents", AvailableIntentsProvider("Available Intents"))
+# Guards the shared chat history while a turn is added or read back
+_AGENT_LOCK = asyncio.Lock()
+
+
+###########################
+# LOCAL INTENT CLASSIFIER #
+###########################
+class IntentClassifier:
+    """
+    Nearest-neighbour intent classifier over the embeddings of INTENT_PHRASES.
+    Only answers when the best intent is both similar enough and clearly ahead of
+    the runner-up; on/off pairs embed very close to each other.
+    """
+
+    def __init__(self, phrases: Dict[IntentName, List[str]], threshold: float, margin: float):
+        self.labels = [intent for intent, texts in phrases.items() for _ in texts]
+        self.texts = [text for texts in phrases.values() for text in texts]
+        self.threshold = threshold
+        self.margin = margin
+        self.matrix = None  # (n_phrases, d), built on first use
+
+    def classify(self, user_query: str) -> Optional[IntentName]:
+        """
+        Returns the matching intent, or None when the match is not confident.
+        This is CPU-bound, call it off the event loop.
+        """
+        if self.matrix is None:
+            self.matrix = embed(self.texts)
+        scores = self.matrix @ embed(user_query.strip().lower())
+
+        best_per_intent: Dict[IntentName, float] = {}
+        for intent, score in zip(self.labels, scores):
+            best_per_intent[intent] = max(score, best_per_intent.get(intent, -1.0))
+        ranked = sorted(best_per_intent.items(), key=lambda item: item[1], reverse=True)
+
+        (best_intent, best_score), (_, runner_up_score) = ranked[0], ranked[1]
+        logger.info(f"Local intent match: {best_intent.value} ({best_score:.3f}, runner-up {runner_up_score:.3f})")
+        if best_score >= self.threshold and best_score - runner_up_score >= self.margin:
+            return best_intent
+        return None
+
+
+_CLASSIFIER = IntentClassifier(
+    INTENT_PHRASES,
+    threshold=Config.INTENT_SIMILARITY_THRESHOLD,
+    margin=Config.INTENT_SIMILARITY_MARGIN,
+)
+
+
 #########################
 # HOME ASSISTANT METHODS #
 #########################
-def invoke_intent(intent_name: str) -> Optional[str]:
+async def get_intent_name(user_query: str) -> IntentName:
+    """
+    Map a user query to a Home Assistant intent.
+    Tries the local embedding classifier first and falls back to the LLM agent.
+    """
+    intent_name = await asyncio.to_thread(_CLASSIFIER.classify, user_query)
+    if intent_name:
+        return intent_name
+
+    logger.info(f"No confident local intent match, asking the LLM for: {user_query}")
+    async with _AGENT_LOCK:
+        _AGENT.history.initialize_turn()
+        _AGENT.history.add_message("user", HomeAssistantInputSchema(user_query=user_query))
+        _AGENT._prepare_messages()
+        messages = list(_AGENT.messages)
+    # Sent outside the lock, so concurrent queries overlap their round-trips
+    output: HomeAssistantOutputSchema = await _AGENT.client.chat.completions.create(
+        model=_AGENT.model,
+        messages=messages,
+        response_model=HomeAssistantOutputSchema,
+        **_AGENT.model_api_parameters,
+    )
+    async with _AGENT_LOCK:
+        _AGENT.history.add_message("assistant", output)
+    return output.intent_name
+
+
+async def invoke_intent(intent_name: str) -> Optional[str]:
     """
     Call Home Assistant's intent API with the given intent.
     """
@@ -87,20 +201,14 @@ def invoke_intent(intent_name: str) -> Optional[str]:
 
     payload = {"name": intent_name}
 
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {Config.HOME_ASSISTNAT_TOKEN}"
-    }
-
-    response = requests.post(url, json=payload, headers=headers)
-
-    if response.status_code in (200, 201):
-        logger.info(f"Intent invoked successfully: {response.json()}")
-        return f"Intent invoked successfully: {response.json()}"
-    else:
-        logger.error(f"Failed to invoke intent: {response.status_code} - {response.text}")
-        return None
+    async with get_session().post(url, json=payload, headers=_HEADERS, timeout=_TIMEOUT) as response:
+        if response.status in (200, 201):
+            result = await response.json()
+            logger.info(f"Intent invoked successfully: {result}")
+            return f"Intent invoked successfully: {result}"
+        else:
+            logger.error(f"Failed to invoke intent: {response.status} - {await response.text()}")
+            return None
 
 
 
@@ -108,12 +216,13 @@ def invoke_intent(intent_name: str) -> Optional[str]:
 # DEMO EXECUTION #
 #####################
 if __name__ == "__main__":
-    # Example 1: Turn on ceiling lights
-    agent = AtomicAgent[HomeAssistantInputSchema, HomeAssistantOutputSchema](config=home_assistant_agent_config)
-    agent.register_context_provider("available_intents", AvailableIntentsProvider("Available Intents"))
-    output1 = agent.run(HomeAssistantInputSchema(user_query="Turn on the Keyboard Strip"))
-    print(output1)
-
-    # Example 2: Get temperature
-    output2 = agent.run(HomeAssistantInputSchema(user_query="What is the temperature right now?"))
-    print(output2)
+    async def main():
+        # Example 1: Turn on ceiling lights
+        output1 = await get_intent_name("Turn on the Keyboard Strip")
+        print(output1)
+
+        # Example 2: Get temperature
+        output2 = await get_intent_name("What is the temperature right now?")
+        print(output2)
+
+    asyncio.run(main())
@@ -0,0 +1,27 @@
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from src.config import Config
+from src.logger import logger
+
+
+# One client, and one connection pool, shared by every agent
+openrouter_client = AsyncOpenAI(
+    base_url="https://openrouter.ai/api/v1",
+    api_key=Config.OPENROUTER_API_KEY,
+    http_client=DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    ),
+)
+
+
+async def warm_up_openrouter_client():
+    """
+    Sends a cheap request so DNS resolution and the TLS handshake happen at startup
+    rather than on the first user message.
+    """
+    try:
+        await openrouter_client.models.list()
+        logger.info("OpenRouter connection warmed up")
+    except Exception as e:
+        logger.warning(f"Failed to warm up the OpenRouter connection: {e}")
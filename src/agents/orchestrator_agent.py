@@ -1,12 +1,17 @@
-from typing import Union, Literal
-from openai import OpenAI as OpenRouterClient
+from typing import Dict, List, Optional, Union, Literal, get_args
+import asyncio
+import json
 from pydantic import Field
-from atomic_agents import AtomicAgent, AgentConfig, BaseIOSchema
-from atomic_agents.context import SystemPromptGenerator, BaseDynamicContextProvider
+from atomic_agents import AgentConfig, BaseIOSchema
+from src.agents.prefix_caching_agent import PrefixCachingAgent
+from atomic_agents.context import SystemPromptGenerator
+from src.agents.context_providers import CurrentDateProvider
+from src.agents.openrouter_client import openrouter_client
 from src.config import Config
+from src.cache.tool_cache import tool_cache
+from src.logger import logger
 
 import instructor
-from datetime import datetime
 
 
 ########################
@@ -18,30 +23,59 @@ class OrchestratorInputSchema(BaseIOSchema):
     chat_message: str = Field(..., description="The user's input message to be analyzed and classified.")
 
 
+ToolName = Literal['Home Assistant Tool', 'SearXNG Tool', 'Vikunja Tool', 'No Tool']
+
+
 class OrchestratorOutputSchema(BaseIOSchema):
     """
     Updated output schema for the GLaDOS Agent.
     It now contains the name of the tool to be used, including a 'No Tool' option.
     """
-    tool_name: Literal['Home Assistant Tool', 'SearXNG Tool', 'Vikunja Tool', 'No Tool'] = Field(
+    tool_name: ToolName = Field(
         ...,
         description="The name of the tool that should be used to respond to the query. "
                     "Must be one of the following: 'Home Assistant Tool', 'SearXNG Tool', "
                     "or 'Vikunja Tool'. If the query is a simple conversational message and "
                     "does not require any tool to be used, select 'No Tool'."
     )
+    direct_response: Optional[str] = Field(
+        None,
+        description="Only when tool_name is 'No Tool': the reply to the user in the sarcastic, "
+                    "laconic tone of GLaDOS. Leave empty for every other tool."
+    )
 
 
-#####################
-# CONTEXT PROVIDERS #
-#####################
-class CurrentDateProvider(BaseDynamicContextProvider):
-    def __init__(self, title):
-        super().__init__(title)
-        self.date = datetime.now().strftime("%Y-%m-%d")
+# Native structured-output formats for the raw completion calls, built once
+# so the hot path only has to json.loads the reply
+_OUTPUT_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "tool_name": {"type": "string", "enum": list(get_args(ToolName))},
+        "direct_response": {"type": ["string", "null"]},
+    },
+    "required": ["tool_name", "direct_response"],
+    "additionalProperties": False,
+}
 
-    def get_info(self) -> str:
-        return f"Current date in format YYYY-MM-DD: {self.date}"
+_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "orchestrator_output", "strict": True, "schema": _OUTPUT_JSON_SCHEMA},
+}
+
+# Several messages classified in one call, one entry per message in order
+_BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "orchestrator_batch_output",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"classifications": {"type": "array", "items": _OUTPUT_JSON_SCHEMA}},
+            "required": ["classifications"],
+            "additionalProperties": False,
+        },
+    },
+}
 
 
 ######################
@@ -49,7 +83,8 @@ class CurrentDateProvider(BaseDynamicContextProvider):
 ######################
 orchestrator_agent_config = AgentConfig(
     client=instructor.from_openai(
-        OpenRouterClient(base_url="https://openrouter.ai/api/v1", api_key=Config.OPENROUTER_API_KEY),
+        openrouter_client,
+        mode=instructor.Mode.TOOLS,
     ),
     model = Config.ORCHESTRATOR_AGENT_MODEL,
     system_prompt_generator = SystemPromptGenerator(
@@ -65,50 +100,179 @@ orchestrator_agent_config = AgentConfig(
         output_instructions=[
             "Analyze the input and select the most relevant tool or 'No Tool' if none apply.",
             "Provide only the name of that tool.",
+            "If you select 'No Tool', also write direct_response: a single concise reply to the user as GLaDOS, "
+            "the sarcastic, passive-aggressive AI from Portal 2, in an emotionless, laconic tone, in English, "
+            "without markdown since it will be spoken aloud.",
             "Format output using the defined schema."
         ],
     )
 )
 
 
-def get_tool_name(user_input: str) -> str:
+######################
+# ORCHESTRATOR AGENT #
+######################
+# Built once at import so each message only pays for the LLM call
+_AGENT = PrefixCachingAgent[OrchestratorInputSchema, OrchestratorOutputSchema](config=orchestrator_agent_config)
+_AGENT.register_context_provider("current_date", CurrentDateProvider("Current Date"))
+# Building the prompt mutates the agent's history, so it is serialized; the call itself isn't
+_AGENT_LOCK = asyncio.Lock()
+
+
+async def _complete(chat_message: str, response_format: dict) -> Optional[dict]:
+    """Runs one orchestrator completion and returns the parsed JSON reply, None if it isn't valid JSON."""
+    async with _AGENT_LOCK:
+        # Each classification is independent, start from an empty history
+        _AGENT.reset_history()
+        _AGENT.history.initialize_turn()
+        _AGENT.history.add_message("user", OrchestratorInputSchema(chat_message=chat_message))
+        # The agent only builds the prompt; the call itself skips instructor's
+        # tool-calling wrapper and asks the provider for schema-constrained JSON
+        _AGENT._prepare_messages()
+        messages = list(_AGENT.messages)
+    # Sent outside the lock, so concurrent classifications overlap their round-trips
+    completion = await openrouter_client.chat.completions.create(
+        model=_AGENT.model,
+        messages=messages,
+        response_format=response_format,
+        # Only route to providers that honour response_format
+        extra_body={"provider": {"require_parameters": True}},
+    )
+    content = completion.choices[0].message.content
+    try:
+        return json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        logger.warning(f"Orchestrator reply is not valid JSON: {content!r}")
+        return None
+
+
+def _to_output(user_input: str, data: Optional[dict], embedding) -> OrchestratorOutputSchema:
+    # The provider enforces the schema, skip pydantic validation beyond the tool name.
+    # A reply without a known tool falls back to a responder reply and isn't cached
+    if not isinstance(data, dict) or data.get("tool_name") not in get_args(ToolName):
+        logger.warning(f"Unusable orchestrator output {data!r}, falling back to No Tool")
+        return OrchestratorOutputSchema.model_construct(tool_name="No Tool", direct_response=None)
+
+    glados_output = OrchestratorOutputSchema.model_construct(
+        tool_name=data["tool_name"], direct_response=data.get("direct_response")
+    )
+    # Persisting the cache writes it to disk, do it in the background off the event loop
+    asyncio.get_running_loop().run_in_executor(
+        None, tool_cache.add, user_input, glados_output.tool_name, embedding
+    ).add_done_callback(_log_failed_cache_add)
+    return glados_output
+
+
+def _log_failed_cache_add(future: asyncio.Future):
+    if future.exception():
+        logger.error(f"Failed to store the classification in the tool cache: {future.exception()}")
+
+
+def _from_cache(tool_name: str) -> OrchestratorOutputSchema:
+    logger.info(f"Tool cache hit: {tool_name}")
+    return OrchestratorOutputSchema.model_construct(tool_name=tool_name, direct_response=None)
+
+
+# Normalized query -> classification in progress, so identical messages
+# arriving before the first one is cached share a single LLM call
+_IN_FLIGHT: Dict[str, asyncio.Task] = {}
+
+
+async def classify_query(user_input: str) -> OrchestratorOutputSchema:
     """
-    A simple function to demonstrate how to use the updated agent.
-    It takes a user message and returns the name of the selected tool.
+    Classify a user message into the tool to use.
+    For 'No Tool' the output also carries the GLaDOS reply, saving a responder call,
+    except on a tool cache hit where direct_response is None.
+    """
+    logger.debug("User query: '{}'", user_input)
+
+    key = tool_cache.normalize(user_input)
+    task = _IN_FLIGHT.get(key)
+    if task is None:
+        task = asyncio.create_task(_classify_query(user_input))
+        _IN_FLIGHT[key] = task
+        task.add_done_callback(lambda _: _IN_FLIGHT.pop(key, None))
+    # Shielded so one caller being cancelled doesn't cancel the others' result
+    return await asyncio.shield(task)
+
+
+async def _classify_query(user_input: str) -> OrchestratorOutputSchema:
+    # Embedding the query is CPU-bound, keep it off the event loop
+    cached_tool_name, embedding = await asyncio.to_thread(tool_cache.lookup, user_input)
+    if cached_tool_name:
+        return _from_cache(cached_tool_name)
+
+    return _to_output(user_input, await _complete(user_input, _RESPONSE_FORMAT), embedding)
+
+
+async def classify_queries(user_inputs: List[str]) -> List[OrchestratorOutputSchema]:
     """
-    # Instantiate the agent with the updated config
-    orchestrator_agent = AtomicAgent[OrchestratorInputSchema, OrchestratorOutputSchema](config=orchestrator_agent_config)
+    Classify several messages sent in quick succession.
+    Cache misses are classified together in a single LLM call; the outputs
+    are returned in the same order as the inputs.
+    """
+    if len(user_inputs) == 1:
+        return [await classify_query(user_inputs[0])]
+
+    logger.debug("User queries: {}", user_inputs)
+
+    lookups = await asyncio.gather(*(asyncio.to_thread(tool_cache.lookup, user_input) for user_input in user_inputs))
+    outputs: List[Optional[OrchestratorOutputSchema]] = [
+        _from_cache(cached_tool_name) if cached_tool_name else None for cached_tool_name, _ in lookups
+    ]
+    misses = [i for i, output in enumerate(outputs) if output is None]
+
+    if len(misses) == 1:
+        i = misses[0]
+        outputs[i] = _to_output(user_inputs[i], await _complete(user_inputs[i], _RESPONSE_FORMAT), lookups[i][1])
+    elif misses:
+        numbered_queries = "\n".join(f"{n}. {user_inputs[i]}" for n, i in enumerate(misses, start=1))
+        chat_message = (
+            f"The user sent {len(misses)} messages in quick succession. "
+            f"Classify each one separately, in order, as one entry of classifications:\n{numbered_queries}"
+        )
+        data = await _complete(chat_message, _BATCH_RESPONSE_FORMAT)
+        classifications = data.get("classifications") if isinstance(data, dict) else None
+
+        if isinstance(classifications, list) and len(classifications) == len(misses):
+            for i, data in zip(misses, classifications):
+                outputs[i] = _to_output(user_inputs[i], data, lookups[i][1])
+        else:
+            logger.warning(f"Batch classification returned {classifications!r} for {len(misses)} messages, classifying one by one")
+            for i in misses:
+                outputs[i] = _to_output(user_inputs[i], await _complete(user_inputs[i], _RESPONSE_FORMAT), lookups[i][1])
 
-    # Register context providers
-    orchestrator_agent.register_context_provider("current_date", CurrentDateProvider("Current Date"))
+    return outputs
 
-    print(f"User query: '{user_input}'")
-    
-    # Run the agent with the user's message
-    glados_output = orchestrator_agent.run(OrchestratorInputSchema(chat_message=user_input))
-    
+
+async def get_tool_name(user_input: str) -> str:
+    """
+    A simple function to demonstrate how to use the updated agent.
+    It takes a user message and returns the name of the selected tool.
+    """
     # Return the tool name from the parsed output
-    return glados_output.tool_name
+    return (await classify_query(user_input)).tool_name
 
 
 if __name__ == "__main__":
     #####################
     # DEMO EXECUTION #
     #####################
+    async def main():
+        # Example 1: Home Assistant query
+        tool_1 = await get_tool_name("Turn off the living room lights, you incompetent simpleton.")
+        print(f"Tool selected: {tool_1}\n")
 
-    # Example 1: Home Assistant query
-    tool_1 = get_tool_name("Turn off the living room lights, you incompetent simpleton.")
-    print(f"Tool selected: {tool_1}\n")
+        # Example 2: SearXNG query
+        tool_2 = await get_tool_name("Find a recipe for cake. Not that you'd know how to use an oven.")
+        print(f"Tool selected: {tool_2}\n")
 
-    # Example 2: SearXNG query
-    tool_2 = get_tool_name("Find a recipe for cake. Not that you'd know how to use an oven.")
-    print(f"Tool selected: {tool_2}\n")
+        # Example 3: Vikunja query
+        tool_3 = await get_tool_name("Add 'Buy more test subjects' to my to-do list.")
+        print(f"Tool selected: {tool_3}\n")
 
-    # Example 3: Vikunja query
-    tool_3 = get_tool_name("Add 'Buy more test subjects' to my to-do list.")
-    print(f"Tool selected: {tool_3}\n")
-    
-    # Example 4: The new "no tool" case
-    tool_4 = get_tool_name("Hello, you look like a fat idiot from where I'm standing.")
-    print(f"Tool selected: {tool_4}\n")
+        # Example 4: The new "no tool" case
+        tool_4 = await get_tool_name("Hello, you look like a fat idiot from where I'm standing.")
+        print(f"Tool selected: {tool_4}\n")
 
+    asyncio.run(main())
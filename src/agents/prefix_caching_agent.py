@@ -0,0 +1,41 @@
+from atomic_agents import AtomicAgent, BaseIOSchema
+from atomic_agents.context import SystemPromptGenerator
+
+
+# Header SystemPromptGenerator puts in front of the context providers' output
+CONTEXT_SECTION_HEADER = "# EXTRA INFORMATION AND CONTEXT"
+
+
+def build_system_message(role: str, system_prompt_generator: SystemPromptGenerator) -> dict:
+    """
+    Builds the system message as two text blocks: the static instructions, tagged with
+    cache_control as a prompt-cache breakpoint, followed by the context providers' output.
+    """
+    prompt = system_prompt_generator.generate_prompt()
+    static_prompt, header, dynamic_prompt = prompt.partition(CONTEXT_SECTION_HEADER)
+
+    content = [{"type": "text", "text": static_prompt.strip(), "cache_control": {"type": "ephemeral"}}]
+    if header:
+        content.append({"type": "text", "text": header + dynamic_prompt})
+    return {"role": role, "content": content}
+
+
+class PrefixCachingAgent[InputSchema: BaseIOSchema, OutputSchema: BaseIOSchema](AtomicAgent[InputSchema, OutputSchema]):
+    """
+    AtomicAgent that marks the static part of its system prompt as a cache breakpoint.
+
+    The system message is sent as two text blocks: the background and output
+    instructions, tagged with cache_control so providers that support prompt
+    caching (Anthropic, Gemini via OpenRouter) can reuse the prefix, followed by
+    the dynamic context providers' output, which changes between requests.
+    Providers with automatic prefix caching (OpenAI) benefit from the stable
+    prefix as well.
+    """
+
+    def _prepare_messages(self):
+        if self.system_role is None:
+            super()._prepare_messages()
+            return
+
+        self.messages = [build_system_message(self.system_role, self.system_prompt_generator)]
+        self.messages += self.history.get_history()
@@ -0,0 +1,122 @@
+import os
+import sys
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from src.agents import orchestrator_agent  # noqa: E402
+from src.agents.orchestrator_agent import _BATCH_RESPONSE_FORMAT, _RESPONSE_FORMAT, classify_queries  # noqa: E402
+
+
+@pytest.fixture
+def mock_tool_cache():
+    # Every lookup misses, so each query goes to the LLM
+    with patch.object(orchestrator_agent, "tool_cache") as mock_cache:
+        mock_cache.lookup = MagicMock(return_value=(None, None))
+        mock_cache.normalize = lambda text: text.strip().lower()
+        yield mock_cache
+
+
+@pytest.fixture
+def mock_complete():
+    with patch.object(orchestrator_agent, "_complete", new_callable=AsyncMock) as mock:
+        yield mock
+
+
+@pytest.mark.asyncio
+async def test_single_query_is_classified_alone(mock_tool_cache, mock_complete):
+    mock_complete.return_value = {"tool_name": "SearXNG Tool", "direct_response": None}
+
+    outputs = await classify_queries(["What's the weather in Rome?"])
+
+    assert [output.tool_name for output in outputs] == ["SearXNG Tool"]
+    mock_complete.assert_awaited_once_with("What's the weather in Rome?", _RESPONSE_FORMAT)
+
+
+@pytest.mark.asyncio
+async def test_misses_are_classified_in_one_batch_call(mock_tool_cache, mock_complete):
+    mock_complete.return_value = {"classifications": [
+        {"tool_name": "Home Assistant Tool", "direct_response": None},
+        {"tool_name": "No Tool", "direct_response": "Delightful."},
+    ]}
+
+    outputs = await classify_queries(["Turn off the lights", "Thanks"])
+
+    assert [output.tool_name for output in outputs] == ["Home Assistant Tool", "No Tool"]
+    assert outputs[1].direct_response == "Delightful."
+    mock_complete.assert_awaited_once()
+    assert mock_complete.await_args.args[1] == _BATCH_RESPONSE_FORMAT
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_skip_the_llm(mock_tool_cache, mock_complete):
+    mock_tool_cache.lookup.side_effect = [("Vikunja Tool", None), (None, None)]
+    mock_complete.return_value = {"tool_name": "SearXNG Tool", "direct_response": None}
+
+    outputs = await classify_queries(["Add a task", "Search for cake recipes"])
+
+    assert [output.tool_name for output in outputs] == ["Vikunja Tool", "SearXNG Tool"]
+    # A single miss is classified on its own, not as a batch
+    mock_complete.assert_awaited_once_with("Search for cake recipes", _RESPONSE_FORMAT)
+
+
+@pytest.mark.asyncio
+async def test_batch_length_mismatch_falls_back_to_one_call_per_message(mock_tool_cache, mock_complete):
+    mock_complete.side_effect = [
+        {"classifications": [{"tool_name": "Home Assistant Tool", "direct_response": None}]},
+        {"tool_name": "Home Assistant Tool", "direct_response": None},
+        {"tool_name": "Vikunja Tool", "direct_response": None},
+    ]
+
+    outputs = await classify_queries(["Turn off the lights", "Add a task"])
+
+    assert [output.tool_name for output in outputs] == ["Home Assistant Tool", "Vikunja Tool"]
+    assert mock_complete.await_count == 3
+    assert [call.args for call in mock_complete.await_args_list[1:]] == [
+        ("Turn off the lights", _RESPONSE_FORMAT),
+        ("Add a task", _RESPONSE_FORMAT),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_malformed_batch_reply_falls_back_to_one_call_per_message(mock_tool_cache, mock_complete):
+    mock_complete.side_effect = [
+        {"unexpected": []},
+        {"tool_name": "Home Assistant Tool", "direct_response": None},
+        {"tool_name": "Vikunja Tool", "direct_response": None},
+    ]
+
+    outputs = await classify_queries(["Turn off the lights", "Add a task"])
+
+    assert [output.tool_name for output in outputs] == ["Home Assistant Tool", "Vikunja Tool"]
+
+
+@pytest.mark.asyncio
+async def test_unparseable_reply_falls_back_to_no_tool_and_is_not_cached(mock_tool_cache, mock_complete):
+    mock_complete.return_value = None  # _complete couldn't parse the reply
+
+    outputs = await classify_queries(["Turn off the lights"])
+
+    assert outputs[0].tool_name == "No Tool"
+    assert outputs[0].direct_response is None
+    mock_tool_cache.add.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("content", ["```json\n{}\n```", "Home Assistant Tool", None])
+async def test_complete_returns_none_for_non_json_replies(content):
+    completion = MagicMock()
+    completion.choices[0].message.content = content
+    with patch.object(orchestrator_agent, "openrouter_client") as mock_client:
+        mock_client.chat.completions.create = AsyncMock(return_value=completion)
+
+        assert await orchestrator_agent._complete("Turn off the lights", _RESPONSE_FORMAT) is None
+
+        # Only providers honouring response_format may serve the request
+        kwargs = mock_client.chat.completions.create.await_args.kwargs
+        assert kwargs["extra_body"] == {"provider": {"require_parameters": True}}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
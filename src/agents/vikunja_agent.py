@@ -1,14 +1,25 @@
 from typing import Literal, List, Optional
-from openai import OpenAI as OpenRouterClient
+import asyncio
+import time
+from src.agents.openrouter_client import openrouter_client
 from pydantic import Field
-from atomic_agents import AtomicAgent, AgentConfig, BaseIOSchema
-from atomic_agents.context import SystemPromptGenerator, BaseDynamicContextProvider
+from atomic_agents import AgentConfig, BaseIOSchema
+from src.agents.prefix_caching_agent import PrefixCachingAgent, build_system_message
+from atomic_agents.context import ChatHistory, SystemPromptGenerator, BaseDynamicContextProvider
+from src.agents.context_providers import CurrentDateProvider
 from src.config import Config
 import instructor
-from datetime import datetime
-import requests
+import aiohttp
+from src.http_session import close_session, get_session
 from src.logger import logger
 
+
+_HEADERS = {
+    "Accept": "application/json",
+    "Authorization": f"Bearer {Config.VIKUNJA_TOKEN}"
+}
+_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
 ########################
 # INPUT/OUTPUT SCHEMAS #
 ########################
@@ -33,38 +44,35 @@ class VikunjaOutputSchema(BaseIOSchema):
 #####################
 # CONTEXT PROVIDERS #
 #####################
-class CurrentDateProvider(BaseDynamicContextProvider):
-    def __init__(self, title):
-        super().__init__(title)
-        self.date = datetime.now().strftime("%Y-%m-%d")
-
-    def get_info(self) -> str:
-        return f"Current date in format YYYY-MM-DD: {self.date}"
-    
 class AvailableProjectsProvider(BaseDynamicContextProvider):
-    def __init__(self, title):
+    def __init__(self, title, ttl: int = Config.VIKUNJA_PROJECTS_TTL):
         super().__init__(title)
         self.projects = None
+        self.ttl = ttl
+        self.fetched_at = 0.0
+
+    def is_stale(self) -> bool:
+        """True if the projects were never fetched or are older than the TTL."""
+        return not self.projects or time.monotonic() - self.fetched_at > self.ttl
 
+    def invalidate(self):
+        """Forces the next is_stale() check to return True."""
+        self.fetched_at = 0.0
 
-    def get_projects(self):
+    async def get_projects(self):
         """
         Fetch all projects from Vikunja and update self.projects.
+        get_info() is synchronous, so this must be awaited before the agent runs.
         """
         url = f"{Config.VIKUNJA_BASE_URL}/projects"
-        headers = {
-            "Accept": "application/json",
-            "Authorization": f"Bearer {Config.VIKUNJA_TOKEN}"
-        }
-
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        self.projects = response.json()
+
+        async with get_session().get(url, headers=_HEADERS, timeout=_TIMEOUT) as response:
+            response.raise_for_status()
+            self.projects = await response.json()
+        self.fetched_at = time.monotonic()
         return self.projects
 
     def get_info(self) -> str:
-        if not self.projects:
-            self.get_projects()
         if not self.projects:
             return "No projects available."
         return "\n".join([f"{p['title']} (id: {p['id']})" for p in self.projects])
@@ -75,7 +83,8 @@ class AvailableProjectsProvider(BaseDynamicContextProvider):
 ######################
 vikunja_agent_config = AgentConfig(
     client=instructor.from_openai(
-        OpenRouterClient(base_url="https://openrouter.ai/api/v1", api_key=Config.OPENROUTER_API_KEY),
+        openrouter_client,
+        mode=instructor.Mode.TOOLS,
     ),
     model=Config.VIKUNJA_AGENT_MODEL,
     system_prompt_generator=SystemPromptGenerator(
@@ -97,11 +106,21 @@ vikunja_agent_config = AgentConfig(
 )
 
 
+#################
+# VIKUNJA AGENT #
+#################
+# Built once at import so each message only pays for the LLM call
+_AGENT = PrefixCachingAgent[VikunjaInputSchema, VikunjaOutputSchema](config=vikunja_agent_config)
+_PROJECTS_PROVIDER = AvailableProjectsProvider("Available Projects")
+_AGENT.register_context_provider("current_date", CurrentDateProvider("Current Date"))
+_AGENT.register_context_provider("available_projects", _PROJECTS_PROVIDER)
+
+
 #########################
 # VIKUNJA AGENT FUNCTION #
 #########################
 
-def create_task(project_id: int, title: str, description: str, due_date: str) -> Optional[str]:
+async def create_task(project_id: int, title: str, description: str, due_date: str) -> Optional[str]:
     """
     Create a task in a Vikunja project.
 
@@ -119,63 +138,68 @@ def create_task(project_id: int, title: str, description: str, due_date: str) ->
         "due_date": due_date
     }
 
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {Config.VIKUNJA_TOKEN}"
-    }
-
-    response = requests.put(url, json=payload, headers=headers)
-
-    if response.status_code == 200 or response.status_code == 201:
-        logger.info(f"Task created successfully: {response.json()}")
-        return f"Task created successfully: {response.json()}"
-    else:
-        logger.error(f"Failed to create task: {response.status_code} - {response.text}")
+    async with get_session().put(url, json=payload, headers=_HEADERS, timeout=_TIMEOUT) as response:
+        if response.status == 200 or response.status == 201:
+            task = await response.json()
+            logger.info(f"Task created successfully: {task}")
+            return f"Task created successfully: {task}"
+        else:
+            logger.error(f"Failed to create task: {response.status} - {await response.text()}")
 
 
-def get_pending_tasks() -> Optional[str]:
+async def get_pending_tasks() -> Optional[str]:
     """
     Retrieve all tasks from a Vikunja project.
     
-    :param project_id: The ID of the project.
-    :param token: The authentication token (Bearer).
-    :return: JSON response with the tasks.
+    Only the first VIKUNJA_MAX_PENDING_TASKS are returned: the list is fed to the
+    responder, and every extra token delays its first token.
+
+    :return: The pending tasks formatted one per line.
     """
-    url = f"{Config.VIKUNJA_BASE_URL}/tasks/all?filter=done=false"
+    url = f"{Config.VIKUNJA_BASE_URL}/tasks/all?filter=done=false&per_page={Config.VIKUNJA_MAX_PENDING_TASKS}"
 
-    headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {Config.VIKUNJA_TOKEN}"
-    }
+    async with get_session().get(url, headers=_HEADERS, timeout=_TIMEOUT) as response:
+        if response.status == 200:
+            tasks = (await response.json())[:Config.VIKUNJA_MAX_PENDING_TASKS]
+            return "Pending Tasks: \n\n" + "\n".join(f"{task['title']} - {task['description']}" for task in tasks)
+        else:
+            logger.error(f"Failed to retrieve tasks: {response.status} - {await response.text()}")
+            return None
 
-    response = requests.get(url, headers=headers)
 
-    if response.status_code == 200:
-        response_json = response.json()
-        formatted_tasks = [f"{task['title']} - {task['description']}" for task in response_json]
-        return "Pending Tasks: \n\n" + "\n".join(formatted_tasks)
-    else:
-        logger.error(f"Failed to retrieve tasks: {response.status_code} - {response.text}")
-        return None
+async def refresh_projects() -> int:
+    """
+    Drop the cached project list and fetch it again from Vikunja.
+    Returns the number of projects fetched.
+    """
+    _PROJECTS_PROVIDER.invalidate()
+    projects = await _PROJECTS_PROVIDER.get_projects()
+    logger.info(f"Refreshed Vikunja projects: {len(projects)} available")
+    return len(projects)
 
 
-def process_vikunja_query(user_input: str) -> VikunjaOutputSchema:
+async def process_vikunja_query(user_input: str) -> VikunjaOutputSchema:
     """
     Process a user query with the Vikunja Agent.
     available_projects is a list of dicts like [{"id": 1, "title": "General"}, ...]
     """
-    # Instantiate agent
-    vikunja_agent = AtomicAgent[VikunjaInputSchema, VikunjaOutputSchema](config=vikunja_agent_config)
-
-    # Register context providersA
-    vikunja_agent.register_context_provider("current_date", CurrentDateProvider("Current Date"))
-    vikunja_agent.register_context_provider("available_projects", AvailableProjectsProvider("Available Projects"))
-
     logger.info(f"Processing user input: {user_input}")
 
-    # Run agent
-    result: VikunjaOutputSchema = vikunja_agent.run(VikunjaInputSchema(user_query=user_input))
+    # Projects change on the order of days, only refetch once the TTL expires
+    if _PROJECTS_PROVIDER.is_stale():
+        await _PROJECTS_PROVIDER.get_projects()
+
+    # Run agent. Each query is independent, so it gets its own one-turn history
+    # instead of the agent's shared one and concurrent queries never interleave
+    history = ChatHistory()
+    history.add_message("user", VikunjaInputSchema(user_query=user_input))
+    messages = [build_system_message(_AGENT.system_role, _AGENT.system_prompt_generator)] + history.get_history()
+    result: VikunjaOutputSchema = await _AGENT.client.chat.completions.create(
+        model=_AGENT.model,
+        messages=messages,
+        response_model=VikunjaOutputSchema,
+        **_AGENT.model_api_parameters,
+    )
     action = result.action
     if action == "create_task":
         logger.info(f"Action: create_task")
@@ -184,7 +208,7 @@ def process_vikunja_query(user_input: str) -> VikunjaOutputSchema:
         logger.info(f"Description: {result.description}")
         logger.info(f"Due date: {result.due_date}")
 
-        response = create_task(
+        response = await create_task(
             project_id=result.project_id,
             title=result.title,
             description=result.description,
@@ -198,7 +222,7 @@ def process_vikunja_query(user_input: str) -> VikunjaOutputSchema:
     elif action == "get_tasks":
         logger.info(f"Action: get_tasks")
 
-        tasks = get_pending_tasks()
+        tasks = await get_pending_tasks()
         if tasks:
             logger.info(f"Retrieved tasks: {tasks}")
             return tasks
@@ -211,10 +235,15 @@ def process_vikunja_query(user_input: str) -> VikunjaOutputSchema:
 # DEMO EXECUTION #
 #####################
 if __name__ == "__main__":
-    # Example 1: Create a task
-    output1 = process_vikunja_query("Create a task 'from telegram' in the Personal project")
-    print(output1.model_dump())
+    async def main():
+        # Example 1: Create a task
+        output1 = await process_vikunja_query("Create a task 'from telegram' in the Personal project")
+        print(output1.model_dump())
+
+        # Example 2: Get tasks
+        output2 = await process_vikunja_query("Show me all my pending tasks")
+        print(output2.model_dump())
+
+        await close_session()
 
-    # Example 2: Get tasks
-    output2 = process_vikunja_query("Show me all my pending tasks")
-    print(output2.model_dump())
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+import json
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from atomic_agents import BaseIOSchema
+from atomic_agents.context import ChatHistory
+
+from src.config import Config
+from src.logger import logger
+
+
+class HistoryStore:
+    """
+    Small SQLite key-value store holding serialized chat histories,
+    so conversations survive bot restarts.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.conn: Optional[sqlite3.Connection] = None  # opened on first use
+        self._lock = threading.Lock()
+        # A single writer thread keeps the commits (and their fsync) off the event loop
+        # while applying the saves in the order they were made
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-writer")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Opens the database on first use, creating it if needed. Call it with the lock held."""
+        if self.conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS history (key TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            self.conn.commit()
+        return self.conn
+
+    def load(self, key: str) -> Optional[str]:
+        """Returns the serialized history stored under key, if any."""
+        with self._lock:
+            row = self._connect().execute("SELECT data FROM history WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def save(self, key: str, data: str):
+        """Stores the serialized history under key, replacing the previous one."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO history (key, data) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET data = excluded.data",
+                (key, data),
+            )
+            conn.commit()
+
+    def save_in_background(self, key: str, data: str):
+        """Queues save() on the writer thread and returns without waiting for the commit."""
+        self._writer.submit(self.save, key, data).add_done_callback(self._log_failed_save)
+
+    @staticmethod
+    def _log_failed_save(future: Future):
+        if future.exception():
+            logger.error(f"Failed to save chat history: {future.exception()}")
+
+    def load_messages(self, key: str) -> List[dict]:
+        """Returns a stored list of raw chat messages, or an empty list."""
+        data = self.load(key)
+        return json.loads(data) if data else []
+
+    def save_messages(self, key: str, messages: List[dict]):
+        """Stores a list of raw chat messages, in the background."""
+        self.save_in_background(key, json.dumps(messages))
+
+
+history_store = HistoryStore(Config.HISTORY_DB_PATH)
+
+
+class PersistentChatHistory(ChatHistory):
+    """
+    ChatHistory that checkpoints itself to the history store on every message
+    and reloads the stored conversation the first time it is used.
+    """
+
+    def __init__(self, key: str, max_messages: Optional[int] = None):
+        """
+        Args:
+            key (str): Name the history is stored under.
+            max_messages (Optional[int]): Maximum number of messages to keep in history.
+        """
+        super().__init__(max_messages=max_messages)
+        self.key = key
+        # Histories are built at import time, the database is only read once one is used
+        self._restored = False
+
+    def _restore(self):
+        if self._restored:
+            return
+        self._restored = True
+        data = history_store.load(self.key)
+        if data:
+            try:
+                max_messages = self.max_messages
+                self.load(data)
+                # The configured limit wins over whatever was stored
+                self.max_messages = max_messages
+                self._manage_overflow()
+                logger.info(f"Restored {self.get_message_count()} messages of '{self.key}' history")
+            except (ValueError, ImportError) as e:
+                logger.error(f"Discarding unreadable '{self.key}' history: {e}")
+                self.history = []
+
+    def get_history(self) -> List[dict]:
+        self._restore()
+        return super().get_history()
+
+    def get_message_count(self) -> int:
+        self._restore()
+        return super().get_message_count()
+
+    def add_message(self, role: str, content: BaseIOSchema) -> None:
+        self._restore()
+        super().add_message(role, content)
+        # Serialized now, written on the history store's writer thread
+        history_store.save_in_background(self.key, self.dump())
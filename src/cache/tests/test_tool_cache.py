@@ -0,0 +1,110 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from src.cache import tool_cache as tool_cache_module  # noqa: E402
+from src.cache.tool_cache import ToolCache  # noqa: E402
+
+
+# Fixed unit vectors standing in for the sentence-transformers embeddings
+VECTORS = {
+    "turn off the lights": np.array([1.0, 0.0, 0.0], dtype=np.float32),
+    "switch the lights off": np.array([0.99, 0.141, 0.0], dtype=np.float32),
+    "what's the weather": np.array([0.0, 1.0, 0.0], dtype=np.float32),
+    "add a task": np.array([0.0, 0.0, 1.0], dtype=np.float32),
+}
+
+
+@pytest.fixture(autouse=True)
+def fake_embed(monkeypatch):
+    monkeypatch.setattr(tool_cache_module, "embed", lambda text: VECTORS[text] / np.linalg.norm(VECTORS[text]))
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "tool_cache.pkl")
+
+
+def test_miss_on_empty_cache_returns_the_embedding(cache_path):
+    cache = ToolCache(cache_path, threshold=0.9, max_entries=10)
+
+    tool_name, embedding = cache.lookup("Turn off the lights")
+
+    assert tool_name is None
+    assert embedding is not None
+
+
+def test_exact_hit_ignores_case_and_whitespace(cache_path):
+    cache = ToolCache(cache_path, threshold=0.9, max_entries=10)
+    cache.add("turn off the lights", "Home Assistant Tool")
+
+    tool_name, embedding = cache.lookup("  Turn OFF   the lights ")
+
+    assert tool_name == "Home Assistant Tool"
+    assert embedding is None  # no embedding needed for an exact hit
+
+
+def test_semantic_hit_above_threshold(cache_path):
+    cache = ToolCache(cache_path, threshold=0.9, max_entries=10)
+    _, embedding = cache.lookup("turn off the lights")
+    cache.add("turn off the lights", "Home Assistant Tool", embedding)
+
+    tool_name, _ = cache.lookup("switch the lights off")
+
+    assert tool_name == "Home Assistant Tool"
+
+
+def test_no_semantic_hit_below_threshold(cache_path):
+    cache = ToolCache(cache_path, threshold=0.9, max_entries=10)
+    _, embedding = cache.lookup("turn off the lights")
+    cache.add("turn off the lights", "Home Assistant Tool", embedding)
+
+    tool_name, _ = cache.lookup("what's the weather")
+
+    assert tool_name is None
+
+
+def test_entries_persist_across_instances(cache_path):
+    cache = ToolCache(cache_path, threshold=0.9, max_entries=10)
+    _, embedding = cache.lookup("turn off the lights")
+    cache.add("turn off the lights", "Home Assistant Tool", embedding)
+
+    reloaded = ToolCache(cache_path, threshold=0.9, max_entries=10)
+
+    assert reloaded.lookup("turn off the lights")[0] == "Home Assistant Tool"
+    assert reloaded.lookup("switch the lights off")[0] == "Home Assistant Tool"
+
+
+def test_oldest_entries_are_dropped_beyond_max_entries(cache_path):
+    cache = ToolCache(cache_path, threshold=0.9, max_entries=2)
+    for text, tool_name in [
+        ("turn off the lights", "Home Assistant Tool"),
+        ("what's the weather", "SearXNG Tool"),
+        ("add a task", "Vikunja Tool"),
+    ]:
+        _, embedding = cache.lookup(text)
+        cache.add(text, tool_name, embedding)
+
+    labels, embeddings = cache._semantic
+    assert list(cache.exact) == ["what's the weather", "add a task"]
+    assert labels == ["SearXNG Tool", "Vikunja Tool"]
+    assert embeddings.shape == (2, 3)
+    # The dropped query no longer matches exactly or semantically
+    assert cache.lookup("switch the lights off")[0] is None
+
+
+def test_unreadable_cache_file_starts_empty(cache_path):
+    with open(cache_path, "wb") as f:
+        f.write(b"not a pickle")
+
+    cache = ToolCache(cache_path, threshold=0.9, max_entries=10)
+
+    assert cache.exact == {}
+    assert cache.lookup("turn off the lights")[0] is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
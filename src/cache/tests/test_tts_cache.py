@@ -0,0 +1,68 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from src.cache.tts_cache import TTSCache  # noqa: E402
+
+
+def set_mtime(cache: TTSCache, text: str, mtime: float):
+    os.utime(cache._file_for(text), (mtime, mtime))
+
+
+def test_miss_returns_none(tmp_path):
+    cache = TTSCache(str(tmp_path), max_files=3)
+
+    assert cache.get("Hello, test subject.") is None
+
+
+def test_put_then_get_returns_the_audio(tmp_path):
+    cache = TTSCache(str(tmp_path), max_files=3)
+
+    cache.put("Hello, test subject.", b"mp3 data")
+
+    assert cache.get("Hello, test subject.") == b"mp3 data"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_put_replaces_existing_audio(tmp_path):
+    cache = TTSCache(str(tmp_path), max_files=3)
+    cache.put("Hello, test subject.", b"old")
+
+    cache.put("Hello, test subject.", b"new")
+
+    assert cache.get("Hello, test subject.") == b"new"
+    assert len(list(tmp_path.glob("*.mp3"))) == 1
+
+
+def test_least_recently_used_file_is_evicted(tmp_path):
+    cache = TTSCache(str(tmp_path), max_files=2)
+    cache.put("first", b"1")
+    cache.put("second", b"2")
+    set_mtime(cache, "first", 1000)
+    set_mtime(cache, "second", 2000)
+
+    cache.put("third", b"3")
+
+    assert cache.get("first") is None
+    assert cache.get("second") == b"2"
+    assert cache.get("third") == b"3"
+
+
+def test_get_marks_the_file_as_recently_used(tmp_path):
+    cache = TTSCache(str(tmp_path), max_files=2)
+    cache.put("first", b"1")
+    cache.put("second", b"2")
+    set_mtime(cache, "first", 1000)
+    set_mtime(cache, "second", 2000)
+
+    cache.get("first")  # now newer than "second"
+    cache.put("third", b"3")
+
+    assert cache.get("first") == b"1"
+    assert cache.get("second") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
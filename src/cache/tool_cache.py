@@ -0,0 +1,115 @@
+import os
+import pickle
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import Config
+from src.embeddings import embed
+from src.logger import logger
+
+
+class ToolCache:
+    """
+    Caches the orchestrator's tool classification so repeated or paraphrased
+    queries don't need another LLM round-trip.
+
+    Lookups first try an exact match on the normalized query, then a cosine
+    similarity search over the embeddings of previously classified queries.
+    The cache is persisted to disk after every insert and keeps at most
+    max_entries of each kind, dropping the oldest first.
+    """
+
+    def __init__(self, path: str, threshold: float, max_entries: int):
+        """
+        Args:
+            path (str): File the cache is persisted to.
+            threshold (float): Minimum cosine similarity for a semantic hit.
+            max_entries (int): Maximum number of exact and of semantic entries kept.
+        """
+        self.path = Path(path)
+        self.threshold = threshold
+        self.max_entries = max_entries
+
+        self.exact: Dict[str, str] = {}
+        # (labels, embeddings) replaced as a whole, so a lookup on another thread always
+        # sees rows and labels that match. embeddings is (n, d) with L2-normalized rows
+        self._semantic: Tuple[List[str], Optional[np.ndarray]] = ([], None)
+        self._lock = threading.Lock()  # serializes add()
+        self._load()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercases the text and collapses whitespace."""
+        return re.sub(r"\s+", " ", text.strip().lower())
+
+    def lookup(self, text: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Looks up the tool name for a query.
+        This is CPU-bound, call it off the event loop.
+
+        Returns:
+            Tuple[Optional[str], Optional[np.ndarray]]: The cached tool name (None on a miss) and
+            the query embedding, if one was computed, so the caller can pass it back to add().
+        """
+        tool_name = self.exact.get(self.normalize(text))
+        if tool_name:
+            return tool_name, None
+
+        embedding = embed(self.normalize(text))
+        labels, embeddings = self._semantic
+        if embeddings is not None:
+            scores = embeddings @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                logger.info(f"Tool cache semantic hit ({scores[best]:.3f}) for: {text}")
+                return labels[best], embedding
+        return None, embedding
+
+    def add(self, text: str, tool_name: str, embedding: Optional[np.ndarray] = None):
+        """
+        Stores a classification result and persists the cache.
+        This copies the embeddings and writes the whole cache, call it off the event loop.
+        """
+        with self._lock:
+            self.exact[self.normalize(text)] = tool_name
+            # Dicts keep insertion order, the first keys are the oldest
+            while len(self.exact) > self.max_entries:
+                del self.exact[next(iter(self.exact))]
+            if embedding is not None:
+                labels, embeddings = self._semantic
+                row = embedding.reshape(1, -1)
+                embeddings = row if embeddings is None else np.vstack([embeddings, row])
+                self._semantic = ((labels + [tool_name])[-self.max_entries:], embeddings[-self.max_entries:])
+            self._save()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open("rb") as f:
+                data = pickle.load(f)
+            self.exact = data["exact"]
+            self._semantic = (data["labels"], data["embeddings"])
+            logger.info(f"Loaded tool cache with {len(self.exact)} entries from {self.path}")
+        except Exception as e:
+            logger.error(f"Failed to load tool cache from {self.path}, starting empty: {e}")
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("wb") as f:
+            labels, embeddings = self._semantic
+            pickle.dump({"exact": self.exact, "labels": labels, "embeddings": embeddings}, f)
+        # Atomic swap so a crash mid-write never leaves a truncated cache
+        os.replace(tmp_path, self.path)
+
+
+tool_cache = ToolCache(
+    path=Config.TOOL_CACHE_PATH,
+    threshold=Config.TOOL_CACHE_SIMILARITY_THRESHOLD,
+    max_entries=Config.TOOL_CACHE_MAX_ENTRIES,
+)
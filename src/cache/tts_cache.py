@@ -0,0 +1,69 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+from src.config import Config
+from src.logger import logger
+
+
+class TTSCache:
+    """
+    Content-addressed disk cache of generated TTS audio, so phrases spoken
+    before (greetings, standard error replies) skip the TTS service entirely.
+
+    Files are named after the BLAKE2b hash of the text. A hit refreshes the
+    file's mtime, and the least recently used files are evicted once the cache
+    holds more than max_files entries.
+    All methods do blocking file I/O, call them off the event loop.
+    """
+
+    def __init__(self, path: str, max_files: int):
+        """
+        Args:
+            path (str): Directory the audio files are stored in.
+            max_files (int): Maximum number of cached files.
+        """
+        self.path = Path(path)
+        self.max_files = max_files
+
+    def _file_for(self, text: str) -> Path:
+        key = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        return self.path / f"{key}.mp3"
+
+    def get(self, text: str) -> Optional[bytes]:
+        """Returns the cached audio for the text, if any."""
+        file = self._file_for(text)
+        try:
+            data = file.read_bytes()
+        except FileNotFoundError:
+            return None
+        # Mark as recently used for the eviction
+        file.touch()
+        return data
+
+    def put(self, text: str, data: bytes):
+        """Stores the audio for the text, evicting the oldest files if the cache is full."""
+        file = self._file_for(text)
+        # Created on the first write rather than at import
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_file = file.with_suffix(".tmp")
+        tmp_file.write_bytes(data)
+        # Atomic swap so a crash mid-write never leaves a truncated file
+        os.replace(tmp_file, file)
+        self._evict()
+
+    def _evict(self):
+        files = list(self.path.glob("*.mp3"))
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=lambda f: f.stat().st_mtime)
+        for file in files[: len(files) - self.max_files]:
+            file.unlink(missing_ok=True)
+        logger.info(f"Evicted {len(files) - self.max_files} files from the TTS cache")
+
+
+tts_cache = TTSCache(
+    path=Config.TTS_CACHE_PATH,
+    max_files=Config.TTS_CACHE_MAX_FILES,
+)
@@ -7,19 +7,41 @@ load_dotenv()
 @dataclass
 class Config:
     TELEGRAM_TOKEN: str = os.environ["TELEGRAM_TOKEN"]
+    # Public HTTPS URL of the reverse proxy forwarding to the bot, polling is used when unset
+    TELEGRAM_WEBHOOK_URL: str = os.environ.get("TELEGRAM_WEBHOOK_URL", "")
+    TELEGRAM_WEBHOOK_PORT: int = int(os.environ.get("TELEGRAM_WEBHOOK_PORT", "8443"))
+    TELEGRAM_WEBHOOK_SECRET: str = os.environ.get("TELEGRAM_WEBHOOK_SECRET", "")  # required with a webhook URL
+    TELEGRAM_WEBHOOK_MAX_CONNECTIONS: int = 40  # connections Telegram may open to deliver updates, its default
     MY_CHAT_ID: int = int(os.environ["MY_CHAT_ID"])
     OPENAI_API_KEY: str = os.environ["OPENAI_API_KEY"]
+    OPENAI_TRANSCRIBE_RPM: int = int(os.environ.get("OPENAI_TRANSCRIBE_RPM", "50"))  # depends on the account's usage tier
     OPENROUTER_API_KEY: str = os.environ["OPENROUTER_API_KEY"]
     SEARXNG_URL: str = os.environ["SEARXNG_URL"]
 
     ORCHESTRATOR_AGENT_MODEL: str = "mistralai/devstral-small"
     RESPONDER_AGENT_MODEL: str = "openai/gpt-4o-mini"
+    MAX_CONCURRENT_LLM_CALLS: int = 5  # LLM requests in flight at once across all handlers
+    RESPONDER_MAX_TOOL_RESULT_TOKENS: int = 500  # longer tool results are cut before reaching the responder
+
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    # Mounted as a volume next to logs/ (see readme), so the caches survive rebuilds
+    CACHE_DIR: str = os.environ.get("CACHE_DIR", "cache")
+    TOOL_CACHE_PATH: str = os.environ.get("TOOL_CACHE_PATH", os.path.join(CACHE_DIR, "tool_cache.pkl"))
+    TOOL_CACHE_SIMILARITY_THRESHOLD: float = 0.92
+    TOOL_CACHE_MAX_ENTRIES: int = 5000  # oldest classifications are dropped beyond this
+    HISTORY_DB_PATH: str = os.environ.get("HISTORY_DB_PATH", os.path.join(CACHE_DIR, "history.sqlite"))
+    TTS_CACHE_PATH: str = os.environ.get("TTS_CACHE_PATH", os.path.join(CACHE_DIR, "tts"))
+    TTS_CACHE_MAX_FILES: int = 500
 
     VIKUNJA_BASE_URL: str = os.environ["VIKUNJA_BASE_URL"]
     VIKUNJA_TOKEN: str = os.environ["VIKUNJA_TOKEN"]
     VIKUNJA_AGENT_MODEL: str = "google/gemini-2.0-flash-001"
+    VIKUNJA_PROJECTS_TTL: int = 3600  # seconds before the cached project list is refetched
+    VIKUNJA_MAX_PENDING_TASKS: int = 20  # tasks passed on to the responder
 
     HOME_ASSISTANT_AGENT_MODEL: str = "google/gemini-2.0-flash-001"
+    INTENT_SIMILARITY_THRESHOLD: float = 0.8  # below this the LLM picks the intent
+    INTENT_SIMILARITY_MARGIN: float = 0.05  # required lead of the best intent over the runner-up
     HOME_ASSISTNAT_TOKEN: str = os.environ["HOME_ASSISTANT_TOKEN"]
     HOME_ASSISTANT_BASE_URL: str = os.environ["HOME_ASSISTANT_BASE_URL"]
 
@@ -28,5 +50,12 @@ class Config:
     POSTGRES_DB_PASSWORD: str = os.environ["POSTGRES_DB_PASSWORD"]
     POSTGRES_DB_HOST: str = os.environ["POSTGRES_DB_HOST"]
     POSTGRES_DB_PORT: str = os.environ["POSTGRES_DB_PORT"]
+    POSTGRES_POOL_MIN_SIZE: int = 2
+    # Updates are handled one at a time, so only a journal handler and the daily reminder job
+    # can query at once; the headroom covers a slow connection being replaced
+    POSTGRES_POOL_MAX_SIZE: int = 4
+    # Disable when connecting through a transaction-pooling pgbouncer
+    POSTGRES_PREPARE_STATEMENTS: bool = os.environ.get("POSTGRES_PREPARE_STATEMENTS", "true").lower() == "true"
 
-    JOURNAL_REMINDER_TIME: str = os.environ["JOURNAL_REMINDER_TIME"]
\ No newline at end of file
+    JOURNAL_REMINDER_TIME: str = os.environ["JOURNAL_REMINDER_TIME"]
+    JOURNAL_PEOPLE_TTL: int = 300  # seconds before the people list is refetched
\ No newline at end of file
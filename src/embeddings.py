@@ -0,0 +1,34 @@
+import threading
+from typing import List, Optional, Union
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from src.config import Config
+from src.logger import logger
+
+
+_model: Optional[SentenceTransformer] = None
+_model_lock = threading.Lock()
+
+
+def get_model() -> SentenceTransformer:
+    """Returns the shared sentence-transformers model, loading it on first use."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            logger.info(f"Loading embedding model {Config.EMBEDDING_MODEL}")
+            _model = SentenceTransformer(Config.EMBEDDING_MODEL, device="cpu")
+    return _model
+
+
+def embed(texts: Union[str, List[str]]) -> np.ndarray:
+    """
+    Embeds one text or a list of texts with the shared model.
+    This is CPU-bound, call it off the event loop.
+
+    Returns:
+        np.ndarray: L2-normalized float32 embeddings, shape (d,) for a single text or (n, d) for a list,
+        so a dot product is the cosine similarity.
+    """
+    return get_model().encode(texts, normalize_embeddings=True).astype(np.float32)
@@ -0,0 +1,26 @@
+from typing import Optional
+
+import aiohttp
+
+
+# Outbound calls to Home Assistant, Vikunja and SearXNG share this session,
+# so DNS lookups and TCP+TLS connections are reused across all of them
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Returns the shared aiohttp session, creating it on first use. Must be called from the event loop."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, limit_per_host=16, ttl_dns_cache=300, keepalive_timeout=60),
+        )
+    return _session
+
+
+async def close_session():
+    """Closes the shared session, if it was created."""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
@@ -1,46 +1,138 @@
 from datetime import time, timezone, timedelta
-import json
-from atomic_agents import AtomicAgent
-import requests
-import tempfile
-from telegram import Update
-from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes, MessageHandler, filters, Defaults, CallbackQueryHandler
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import aiohttp
+from telegram import Message, Update
+from telegram.error import RetryAfter
+from telegram.ext import Application, ApplicationBuilder, CommandHandler, ContextTypes, MessageHandler, filters, Defaults, CallbackQueryHandler
 from src.config import Config
 from rich.console import Console
 from src.logger import logger
 from src.transcriber import OpenAITranscriber
-from agents.orchestrator_agent import get_tool_name
+from src.agents.orchestrator_agent import OrchestratorOutputSchema, classify_queries
 from src.tools.searxng_search.tool.searxng_search import SearXNGSearchTool, SearXNGSearchToolConfig, SearXNGSearchToolInputSchema, SearXNGSearchToolOutputSchema
-from src.agents.glados_responder_agent import GladosResponderInputSchema, GladosResponderOutputSchema, glados_responder_config
-from src.agents.vikunja_agent import process_vikunja_query
-from src.agents.home_assistant_agent import HomeAssistantInputSchema, HomeAssistantOutputSchema, invoke_intent, home_assistant_agent_config, AvailableIntentsProvider
+from src.agents.glados_responder_agent import get_encoding, stream_final_glados_response
+from src.agents.openrouter_client import warm_up_openrouter_client
+from src.agents.vikunja_agent import process_vikunja_query, refresh_projects
+from src.agents.home_assistant_agent import get_intent_name, invoke_intent
+from src.cache.tts_cache import tts_cache
+from src.embeddings import get_model
+from src.http_session import close_session, get_session
 from src.tools.journal.tool.journal import Journal
 from src.tools.journal.tool.postgres_db import PostgresDB
 
 
 console = Console()
 
+# Minimum delay between two edits of a streamed reply, in seconds
+STREAM_EDIT_INTERVAL = 0.4
+# Messages sent closer together than this are classified as one batch, in seconds
+MESSAGE_DEBOUNCE_SECONDS = 0.3
+# Voice messages arriving within this window are transcribed together, in seconds
+TRANSCRIBE_BATCH_WINDOW = 0.1
+# Maximum number of voice messages transcribed concurrently
+TRANSCRIBE_BATCH_SIZE = 4
+# Home Assistant TTS request, completed with the message to speak
+TTS_PAYLOAD_TEMPLATE = {"engine_id": "tts.piper", "options": {"voice": "glados"}}
+
 
 class TelegramBot:
     def __init__(self, token):
         # Initialize the application with the provided token
         my_defaults = Defaults(tzinfo=timezone(timedelta(hours=2))) # Set tzinfo to UTC+1
-        self.app = ApplicationBuilder().token(token).defaults(my_defaults).build()
-        self.transcriber = OpenAITranscriber(Config.OPENAI_API_KEY)
-        self.user_message_text: str = ""
+        self.app = ApplicationBuilder().token(token).defaults(my_defaults).post_init(self.post_init).post_shutdown(self.post_shutdown).build()
+        self.transcriber = OpenAITranscriber(
+            Config.OPENAI_API_KEY,
+            requests_per_minute=Config.OPENAI_TRANSCRIBE_RPM,
+            concurrency_limit=TRANSCRIBE_BATCH_SIZE,
+        )
+        # Config values read on every message, bound once
+        self._my_chat_id = Config.MY_CHAT_ID
+        self._tts_url = f"{Config.HOME_ASSISTANT_BASE_URL}/api/tts_get_url"
+        self._tts_headers = {"Authorization": f"Bearer {Config.HOME_ASSISTNAT_TOKEN}"}
         self.daily_job = None # To store the job object
-        self.respoder_agent = AtomicAgent[GladosResponderInputSchema, GladosResponderOutputSchema](config=glados_responder_config)
-        self.home_assistant_agent = AtomicAgent[HomeAssistantInputSchema, HomeAssistantOutputSchema](config=home_assistant_agent_config)
-        self.home_assistant_agent.register_context_provider("available_intents", AvailableIntentsProvider("Available Intents"))
+        self._llm_sem = asyncio.Semaphore(Config.MAX_CONCURRENT_LLM_CALLS)  # caps concurrent LLM calls
+        self.search_tool = SearXNGSearchTool(config=SearXNGSearchToolConfig(), session_factory=get_session)
+        # tool name -> coroutine producing the tool result for the responder
+        self._tool_dispatch: Dict[str, Callable[[str, asyncio.Task], Awaitable[Optional[str]]]] = {
+            "Home Assistant Tool": self._handle_home_assistant,
+            "SearXNG Tool": self._handle_searxng,
+            "Vikunja Tool": self._handle_vikunja,
+            "No Tool": self._handle_no_tool,
+        }
+        # (voice bytes, future for the transcription), consumed by transcription_worker
+        self._transcribe_queue: asyncio.Queue[Tuple[bytes, asyncio.Future]] = asyncio.Queue()
+        self._transcribe_worker: Optional[asyncio.Task] = None
+        self._pending_messages: Dict[int, List[Tuple[Update, str]]] = {}  # chat_id -> messages waiting for the debounce
+        self._debounce_tasks: Dict[int, asyncio.Task] = {}  # chat_id -> pending batch processing
         self.journal_db = PostgresDB(
             db_name=Config.POSTGRES_DB_NAME,
             user=Config.POSTGRES_DB_USER,
             password=Config.POSTGRES_DB_PASSWORD,
             host=Config.POSTGRES_DB_HOST,
-            port=Config.POSTGRES_DB_PORT
+            port=Config.POSTGRES_DB_PORT,
+            min_size=Config.POSTGRES_POOL_MIN_SIZE,
+            max_size=Config.POSTGRES_POOL_MAX_SIZE,
+            prepare_statements=Config.POSTGRES_PREPARE_STATEMENTS,
         )
         self.journal_app = Journal(db=self.journal_db)
 
+    async def post_init(self, application: Application) -> None:
+        """Runs once the event loop is up, before updates start coming in."""
+        # Prime the OpenRouter connection in the background so the first message isn't slowed by DNS + TLS
+        application.create_task(warm_up_openrouter_client())
+        # Load (and on first run download) the embedding model now rather than on the first message
+        application.create_task(asyncio.to_thread(get_model))
+        # Same for the tokenizer truncating tool results, fetched with a blocking download
+        application.create_task(asyncio.to_thread(get_encoding))
+        # Not an application task: it never returns, so the application would wait on it at shutdown
+        self._transcribe_worker = asyncio.create_task(self.transcription_worker())
+        await self.journal_db.connect()
+        await self.journal_app.load_people()
+
+    async def post_shutdown(self, application: Application) -> None:
+        """Runs once the bot has stopped receiving updates."""
+        if self._transcribe_worker:
+            self._transcribe_worker.cancel()
+        await close_session()
+        await self.transcriber.close()
+        await self.journal_db.disconnect()
+
+    async def transcription_worker(self) -> None:
+        """
+        Transcribes queued voice messages.
+        Waits for a voice message, collects whatever else arrives within TRANSCRIBE_BATCH_WINDOW
+        (up to TRANSCRIBE_BATCH_SIZE), then transcribes the batch concurrently.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._transcribe_queue.get()]
+            deadline = loop.time() + TRANSCRIBE_BATCH_WINDOW
+            while len(batch) < TRANSCRIBE_BATCH_SIZE:
+                try:
+                    batch.append(await asyncio.wait_for(self._transcribe_queue.get(), deadline - loop.time()))
+                except TimeoutError:
+                    break
+
+            # The Whisper API has no batch endpoint, so the batch is sent as concurrent requests
+            results = await asyncio.gather(
+                *(self.transcriber.transcribe(voice_data) for voice_data, _ in batch),
+                return_exceptions=True,
+            )
+            for (_, future), result in zip(batch, results):
+                if future.cancelled():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def transcribe(self, voice_data: bytes) -> Optional[str]:
+        """Queues a voice message for transcription and waits for the text, None if it failed."""
+        future = asyncio.get_running_loop().create_future()
+        await self._transcribe_queue.put((voice_data, future))
+        return await future
+
     def check_chat_id(self, chat_id):
         """
         Checks if the provided chat_id matches the hardcoded chat ID.
@@ -52,153 +144,282 @@ class TelegramBot:
         Returns:
             bool: True if the chat ID matches, False otherwise.
         """
-        target_chat_id = Config.MY_CHAT_ID
-        return chat_id == target_chat_id
+        return chat_id == self._my_chat_id
 
     async def hello(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         # Respond with a greeting message including the user's first name
         await update.message.reply_text(f'Hello {update.effective_user.first_name}')
 
+    async def refresh_vikunja_projects(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Forces a refetch of the cached Vikunja project list."""
+        if self.check_chat_id(update.effective_chat.id):
+            project_count = await refresh_projects()
+            await update.message.reply_text(f"Refreshed {project_count} Vikunja projects.")
+
     async def orchestrate_actions(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        """Echoes the user's text message."""
+        """
+        Queues the user's text message for processing.
+        Messages arriving within MESSAGE_DEBOUNCE_SECONDS of each other are classified
+        together in a single orchestrator call.
+        """
         if update.message and update.message.text:
             # Check if the chat ID matches the configured one
-            chat_id = update._effective_message.chat_id
+            chat_id = update.effective_chat.id
             if self.check_chat_id(chat_id):
-                text = update.message.text
-                self.user_message_text = text
-
-                # Process the user message and get the tool name
-                tool_name = get_tool_name(self.user_message_text)
-                logger.info(f"Detected tool: {tool_name} for message: {self.user_message_text}")
-
-
-                # Handle each case
-                if tool_name == "Home Assistant Tool":
-                    output = self.home_assistant_agent.run(
-                        HomeAssistantInputSchema(user_query=self.user_message_text)
-                    ).intent_name.name
-
-                    tool_output = invoke_intent(output)
-
-                    final_response = self.respoder_agent.run(
-                        GladosResponderInputSchema(chat_message=self.user_message_text, tool_result=tool_output)
-                    ).final_response
-
-                elif tool_name == "SearXNG Tool":
-                    search_tool_instance = SearXNGSearchTool(
-                        config=SearXNGSearchToolConfig()
-                    )
-                    search_input = SearXNGSearchToolInputSchema(
-                        queries=[self.user_message_text],
-                        # category="news",
-                    )
-                    output: SearXNGSearchToolOutputSchema = search_tool_instance.run(search_input)
-                    formatted_results = await search_tool_instance.format_results(output.results)
-
-                    final_response = self.respoder_agent.run(
-                        GladosResponderInputSchema(chat_message=self.user_message_text, tool_result=formatted_results)
-                    ).final_response
-
-                elif tool_name == "Vikunja Tool":
-                    output = process_vikunja_query(self.user_message_text)
-                    final_response = self.respoder_agent.run(
-                        GladosResponderInputSchema(chat_message=self.user_message_text, tool_result=output)
-                    ).final_response
-
-                elif tool_name == "No Tool":
-                    final_response = self.respoder_agent.run(
-                        GladosResponderInputSchema(chat_message=self.user_message_text, tool_result=None)
-                    ).final_response
-
-                else:
-                    logger.warning(f"Unknown tool detected: {tool_name}")
-                    final_response = self.respoder_agent.run(
-                        GladosResponderInputSchema(chat_message=self.user_message_text, tool_result=f"Unknown tool detected: {tool_name}")
-                    ).final_response
-
-                await update.message.reply_text(final_response)
-                await self.send_voice_response(update, context, final_response)
-
+                self.queue_user_message(update, context, chat_id, update.message.text)
 
             else:
                 # Reply to the user with a message indicating that the chat ID does not match
                 console.print(f"[bold red]Chat ID {chat_id} does not match the configured chat ID[/bold red]")
                 logger.warning(f"Chat ID {chat_id} does not match the configured chat ID")
 
-    async def handle_voice_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        """Responds to a voice message by echoing it back."""
-        voice_file = update.message.voice
-        if voice_file:
-            file_obj = await voice_file.get_file() # [3, 4]
-            voice_data_bytes = await file_obj.download_as_bytearray()
+    def queue_user_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE, chat_id: int, text: str) -> None:
+        """Adds a message to its chat's pending batch and restarts the debounce window."""
+        self._pending_messages.setdefault(chat_id, []).append((update, text))
+        # Every new message restarts the debounce window
+        debounce_task = self._debounce_tasks.get(chat_id)
+        if debounce_task:
+            debounce_task.cancel()
+        self._debounce_tasks[chat_id] = context.application.create_task(
+            self.process_pending_messages(chat_id, context)
+        )
+
+    async def process_pending_messages(self, chat_id: int, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Waits out the debounce window, then classifies and handles the queued messages of a chat."""
+        await asyncio.sleep(MESSAGE_DEBOUNCE_SECONDS)
+        # From here on the batch is ours: messages arriving now start a new one
+        del self._debounce_tasks[chat_id]
+        batch = self._pending_messages.pop(chat_id)
+        texts = [text for _, text in batch]
+
+        # Speculatively start the web searches while the orchestrator decides:
+        # SearXNG is self-hosted and cheap, and a search-bound query then skips its latency
+        search_tasks = [
+            asyncio.create_task(self.search_tool.run_async(SearXNGSearchToolInputSchema(
+                queries=[text],
+                # category="news",
+            )))
+            for text in texts
+        ]
+
+        try:
+            # Process the user messages and get the tool names
+            async with self._llm_sem:
+                orchestrator_outputs = await classify_queries(texts)
+
+            for orchestrator_output, search_task in zip(orchestrator_outputs, search_tasks):
+                if orchestrator_output.tool_name != "SearXNG Tool":
+                    search_task.cancel()
+
+            for (update, text), orchestrator_output, search_task in zip(batch, orchestrator_outputs, search_tasks):
+                await self.handle_user_message(update, context, text, orchestrator_output, search_task)
+        finally:
+            # Stop any search a failed or cancelled batch left running, and consume every outcome
+            # so a search that failed without being awaited isn't reported as never retrieved
+            for search_task in search_tasks:
+                search_task.cancel()
+                search_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def handle_user_message(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        text: str,
+        orchestrator_output: OrchestratorOutputSchema,
+        search_task: asyncio.Task,
+    ) -> None:
+        """Runs the tool picked by the orchestrator for one message and replies to it."""
+        tool_name = orchestrator_output.tool_name
+        logger.info(f"Detected tool: {tool_name} for message: {text}")
+
+        # The orchestrator already wrote the reply, no need for a responder round-trip
+        if orchestrator_output.direct_response and tool_name == "No Tool":
+            final_response = orchestrator_output.direct_response
+            await update.message.reply_text(final_response)
+            self.send_voice_response_in_background(update, context, final_response)
+            return
+
+        handler = self._tool_dispatch.get(tool_name)
+        if handler:
+            tool_result = await handler(text, search_task)
+        else:
+            logger.warning(f"Unknown tool detected: {tool_name}")
+            tool_result = f"Unknown tool detected: {tool_name}"
+
+        final_response = await self.stream_glados_response(update, text, tool_result)
+        if final_response:
+            self.send_voice_response_in_background(update, context, final_response)
+
+    def send_voice_response_in_background(self, update: Update, context: ContextTypes.DEFAULT_TYPE, text: str) -> None:
+        """
+        Sends the voice reply without holding up the text reply or the next message.
+        The application keeps a reference to the task until it completes and awaits it on shutdown.
+        """
+        context.application.create_task(self._safe_send_voice_response(update, context, text))
+
+    async def _safe_send_voice_response(self, update: Update, context: ContextTypes.DEFAULT_TYPE, text: str) -> None:
+        try:
+            await self.send_voice_response(update, context, text)
+        except Exception:
+            logger.exception("Failed to send voice response")
+
+    async def _handle_home_assistant(self, text: str, search_task: asyncio.Task) -> Optional[str]:
+        async with self._llm_sem:
+            output = (await get_intent_name(text)).name
+        return await invoke_intent(output)
 
-            # Transcribe the voice message using OpenAI Whisper
-            transcribed_text = self.transcriber.transcribe(voice_data_bytes)
-            self.user_message_text = transcribed_text
+    async def _handle_searxng(self, text: str, search_task: asyncio.Task) -> Optional[str]:
+        output: SearXNGSearchToolOutputSchema = await search_task
+        return self.search_tool.format_results(output.results)
 
+    async def _handle_vikunja(self, text: str, search_task: asyncio.Task) -> Optional[str]:
+        async with self._llm_sem:
+            return await process_vikunja_query(text)
+
+    async def _handle_no_tool(self, text: str, search_task: asyncio.Task) -> Optional[str]:
+        return None
+
+    async def stream_glados_response(self, update: Update, chat_message: str, tool_result: Optional[str]) -> Optional[str]:
+        """
+        Streams the GLaDOS reply into a single Telegram message.
+        A placeholder is sent first and edited as tokens arrive, at most once every
+        STREAM_EDIT_INTERVAL seconds to stay clear of Telegram's flood limits.
+
+        Returns:
+            Optional[str]: The complete response text, None if the stream failed or was empty.
+        """
+        message = await update.message.reply_text("…")
+        loop = asyncio.get_running_loop()
+        sent_text = "…"
+        final_response = ""
+        next_edit_at = loop.time() + STREAM_EDIT_INTERVAL
+
+        try:
+            async with self._llm_sem:
+                async for partial_response in stream_final_glados_response(chat_message, tool_result):
+                    final_response = partial_response
+                    if loop.time() >= next_edit_at and final_response != sent_text:
+                        try:
+                            await message.edit_text(final_response)
+                            sent_text = final_response
+                            next_edit_at = loop.time() + STREAM_EDIT_INTERVAL
+                        except RetryAfter as e:
+                            logger.warning(f"Telegram rate limit hit while streaming, backing off {e.retry_after}s")
+                            next_edit_at = loop.time() + float(e.retry_after)
+        except Exception:
+            logger.exception("GLaDOS response stream failed")
+            final_response = ""
+
+        if not final_response:
+            # Don't leave the placeholder hanging, and there is nothing to speak
+            await self._edit_text_with_retry(message, "Sorry, I couldn't come up with a reply.")
+            return None
+
+        # Always flush the complete text, regardless of the edit throttle
+        if final_response != sent_text:
+            await self._edit_text_with_retry(message, final_response)
+        return final_response
+
+    @staticmethod
+    async def _edit_text_with_retry(message: Message, text: str) -> None:
+        """Edits the message, waiting out Telegram's rate limit until the edit goes through."""
+        while True:
+            try:
+                await message.edit_text(text)
+                return
+            except RetryAfter as e:
+                logger.warning(f"Telegram rate limit hit while editing, retrying in {e.retry_after}s")
+                await asyncio.sleep(float(e.retry_after))
+
+    async def handle_voice_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Transcribes a voice message and processes it like a text message.
+        The work continues in a task: updates are handled one at a time, so waiting for the
+        transcription here would keep the next voice message out of the transcription batch.
+        """
+        chat_id = update.effective_chat.id
+        if not self.check_chat_id(chat_id):
+            logger.warning(f"Chat ID {chat_id} does not match the configured chat ID")
+            return
+
+        if update.message.voice:
+            # Passing the update routes a failure to the error handler
+            context.application.create_task(self.process_voice_message(update, context, chat_id), update=update)
         else:
             await update.message.reply_text("I received a message, but it wasn't a voice message")
 
+    async def process_voice_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE, chat_id: int) -> None:
+        """Downloads and transcribes a voice message, then queues its text like a typed message."""
+        file_obj = await update.message.voice.get_file() # [3, 4]
+        # retrieve() returns the downloaded bytes as they are, download_as_bytearray()
+        # would copy them into a bytearray only for the upload to need bytes again
+        voice_data = await context.bot.request.retrieve(file_obj.file_path)
+
+        # Transcribe the voice message using OpenAI Whisper, batched with any other
+        # voice message arriving at the same time
+        transcribed_text = await self.transcribe(voice_data)
+        if transcribed_text is None:
+            await update.message.reply_text("Sorry, I couldn't transcribe your voice message.")
+            return
+        self.queue_user_message(update, context, chat_id, transcribed_text)
+
     async def send_voice_response(self, update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
         """Sends a voice response to the user."""
-        url = f"{Config.HOME_ASSISTANT_BASE_URL}/api/tts_get_url"
-
-        payload = {
-            "engine_id": "tts.piper",
-            "message": text,
-            "options": {
-                "voice": "glados"
-            }
-        }
+        # Phrases spoken before are served from disk, skipping the TTS service
+        cached_audio = await asyncio.to_thread(tts_cache.get, text)
+        if cached_audio:
+            await update.message.reply_voice(voice=cached_audio)
+            logger.info("Voice message successfully sent from the TTS cache.")
+            return None
 
-        headers = {
-            "Authorization": f"Bearer {Config.HOME_ASSISTNAT_TOKEN}"
-        }
+        payload = {**TTS_PAYLOAD_TEMPLATE, "message": text}
+
+        async with get_session().post(self._tts_url, json=payload, headers=self._tts_headers) as response_from_tts_service:
+            if response_from_tts_service.status not in (200, 201):
+                logger.error(f"Failed to invoke TTS service: {response_from_tts_service.status} - {await response_from_tts_service.text()}")
+                await update.message.reply_text("Sorry, the voice generation service is currently unavailable.")
+                return None
+            tts_mp3_url = (await response_from_tts_service.json()).get("url")
+
+        logger.info(f"Successfully invoked TTS service. MP3 URL obtained: {tts_mp3_url}")
 
-        response_from_tts_service = requests.post(url, json=payload, headers=headers)
+        if tts_mp3_url:
+            try:
+                async with get_session().get(tts_mp3_url) as response_mp3_content:
+                    response_mp3_content.raise_for_status() # Raise a ClientResponseError for bad responses (4xx or 5xx)
 
-        if response_from_tts_service.status_code in (200, 201):
-            tts_mp3_url = response_from_tts_service.json().get("url")
-            logger.info(f"Successfully invoked TTS service. MP3 URL obtained: {tts_mp3_url}")
+                    # A spoken reply is a few hundred KB at most, one bytes object serves
+                    # both the upload and the TTS cache. Spooling it to disk would save nothing:
+                    # python-telegram-bot reads a file handle fully into memory to upload it
+                    mp3_audio = await response_mp3_content.read()
+                logger.info(f"Downloaded {len(mp3_audio)} bytes of MP3 content")
+
+                # Step 4: Pass the audio to reply_voice
+                await update.message.reply_voice(voice=mp3_audio)
+                logger.info("Voice message successfully sent.")
 
-            if tts_mp3_url:
                 try:
-                    response_mp3_content = requests.get(tts_mp3_url, stream=True)
-                    response_mp3_content.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
-
-                    # 'delete=True' (default) ensures the file is automatically removed when closed
-                    # 'suffix=".mp3"' helps in identifying the file type
-                    with tempfile.NamedTemporaryFile(delete=True, suffix=".mp3") as temp_file:
-                        # Write the downloaded content in chunks to the temporary file
-                        for chunk in response_mp3_content.iter_content(chunk_size=8192):
-                            temp_file.write(chunk)
-                        temp_file.flush() # Ensure all data is written to the underlying file system
-                        temp_file.seek(0) # Rewind the file pointer to the beginning for reading by telegram-bot
-
-                        logger.info(f"Downloaded MP3 content to temporary file: {temp_file.name}")
-
-                        # Step 4: Pass the temporary file object to reply_voice
-                        await update.message.reply_voice(voice=temp_file)
-                        logger.info("Voice message successfully sent from temporary file.")
-
-                except requests.exceptions.RequestException as e:
-                    logger.error(f"Failed to download MP3 from {tts_mp3_url}: {e}")
-                    await update.message.reply_text("Sorry, I encountered an error while retrieving the voice message.")
-                    return None
-                except Exception as e:
-                    logger.error(f"An unexpected error occurred during voice file processing: {e}")
-                    await update.message.reply_text("An unexpected error occurred while sending the voice message.")
-                    return None
-            else:
-                logger.error("No valid MP3 URL was returned by the TTS service.")
-                await update.message.reply_text("Sorry, I couldn't get a valid voice message URL.")
+                    await asyncio.to_thread(tts_cache.put, text, mp3_audio)
+                except OSError as e:
+                    logger.warning(f"Failed to store voice message in the TTS cache: {e}")
+
+            except aiohttp.ClientError as e:
+                logger.error(f"Failed to download MP3 from {tts_mp3_url}: {e}")
+                await update.message.reply_text("Sorry, I encountered an error while retrieving the voice message.")
+                return None
+            except Exception as e:
+                logger.error(f"An unexpected error occurred during voice file processing: {e}")
+                await update.message.reply_text("An unexpected error occurred while sending the voice message.")
                 return None
         else:
-            logger.error(f"Failed to invoke TTS service: {response_from_tts_service.status_code} - {response_from_tts_service.text}")
-            await update.message.reply_text("Sorry, the voice generation service is currently unavailable.")
+            logger.error("No valid MP3 URL was returned by the TTS service.")
+            await update.message.reply_text("Sorry, I couldn't get a valid voice message URL.")
             return None
 
+    async def error_handler(self, update: object, context: ContextTypes.DEFAULT_TYPE):
+        """Logs the exceptions raised by the handlers and jobs, with their traceback."""
+        logger.opt(exception=context.error).error(f"Error while handling update {update}")
+
     async def send_journal_reminder(self, context: ContextTypes.DEFAULT_TYPE):
         """Send a scheduled message to the configured chat."""
         await self.journal_app.handle_command(None, context)
@@ -216,8 +437,10 @@ class TelegramBot:
 
         # Add your more general handlers after the specific ones
         self.app.add_handler(CommandHandler("hello", self.hello))
+        self.app.add_handler(CommandHandler("refresh_projects", self.refresh_vikunja_projects))
         self.app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.orchestrate_actions))
         self.app.add_handler(MessageHandler(filters.VOICE, self.handle_voice_message))
+        self.app.add_error_handler(self.error_handler)
         
         # Set up daily journal reminder
         journal_reminder_hour, journal_reminder_minute = map(int, Config.JOURNAL_REMINDER_TIME.split(':'))
@@ -233,11 +456,29 @@ class TelegramBot:
         console.print("[bold green]Handlers have been set up successfully![/bold green]")
         
     def run(self):
-        # Run the bot using polling
         console.print("[bold green]Starting Telegram Bot...[/bold green]")
         self.setup_handlers()
-        # It's recommended to pass allowed_updates=Update.ALL_TYPES for comprehensive update handling [5-12].
-        self.app.run_polling(allowed_updates=Update.ALL_TYPES)
+        # The handlers only react to messages and button presses, don't get woken for anything else
+        allowed_updates = [Update.MESSAGE, Update.CALLBACK_QUERY]
+        if Config.TELEGRAM_WEBHOOK_URL:
+            # The journal handlers don't check the chat ID, without a secret anyone who finds
+            # the public URL could post forged updates into the journal
+            if not Config.TELEGRAM_WEBHOOK_SECRET:
+                raise ValueError("TELEGRAM_WEBHOOK_SECRET must be set to receive updates through a webhook.")
+            # Telegram pushes updates as they happen instead of the bot waiting on a long poll.
+            # They are still handled one at a time, extra connections only let Telegram hand
+            # over the next update while the previous one is being processed
+            logger.info(f"Receiving updates through the webhook at {Config.TELEGRAM_WEBHOOK_URL}")
+            self.app.run_webhook(
+                listen="0.0.0.0",
+                port=Config.TELEGRAM_WEBHOOK_PORT,
+                webhook_url=Config.TELEGRAM_WEBHOOK_URL,
+                secret_token=Config.TELEGRAM_WEBHOOK_SECRET,
+                max_connections=Config.TELEGRAM_WEBHOOK_MAX_CONNECTIONS,
+                allowed_updates=allowed_updates,
+            )
+        else:
+            self.app.run_polling(allowed_updates=allowed_updates)
 
 
 
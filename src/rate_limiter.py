@@ -0,0 +1,58 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucketRateLimiter:
+    """
+    Async token bucket: holds up to max_tokens tokens, refilled continuously at
+    refill_rate tokens per second, and each request takes one.
+    Requests pace themselves instead of bursting into the API's rate limit and
+    stalling on 429 back-off.
+
+    Use as an async context manager around each request.
+    """
+
+    def __init__(self, max_tokens: int, refill_rate: float, concurrency_limit: Optional[int] = None):
+        """
+        Args:
+            max_tokens (int): Bucket size, i.e. the largest burst allowed.
+            refill_rate (float): Tokens added per second.
+            concurrency_limit (Optional[int]): Maximum number of requests in flight at once.
+        """
+        self.max_tokens = max_tokens
+        self.refill_rate = refill_rate
+        self._tokens = float(max_tokens)
+        self._updated_at = time.monotonic()
+        # Waiters queue on the lock, so tokens are handed out first come, first served
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(concurrency_limit) if concurrency_limit else None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated_at) * self.refill_rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        """Waits until a token is available and takes it."""
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.refill_rate)
+                self._refill()
+            self._tokens -= 1
+
+    async def __aenter__(self):
+        if self._semaphore:
+            await self._semaphore.acquire()
+        try:
+            await self.acquire()
+        except BaseException:
+            if self._semaphore:
+                self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._semaphore:
+            self._semaphore.release()
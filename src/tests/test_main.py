@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sys
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src import main  # noqa: E402
+from src.agents.orchestrator_agent import OrchestratorOutputSchema  # noqa: E402
+
+CHAT_ID = 42
+
+
+@pytest.fixture
+def bot():
+    bot = main.TelegramBot("123:test")
+    bot.handle_user_message = AsyncMock()
+    bot.search_tool.run_async = AsyncMock()
+    return bot
+
+
+@pytest.fixture
+def context():
+    # The application only needs to schedule the debounce tasks
+    context = MagicMock()
+    context.application.create_task.side_effect = asyncio.create_task
+    return context
+
+
+@pytest.fixture
+def mock_classify():
+    with patch.object(main, "MESSAGE_DEBOUNCE_SECONDS", 0.05), \
+            patch.object(main, "classify_queries", new_callable=AsyncMock) as mock:
+        mock.side_effect = lambda texts: [OrchestratorOutputSchema(tool_name="No Tool") for _ in texts]
+        yield mock
+
+
+@pytest.mark.asyncio
+async def test_messages_inside_the_debounce_window_are_classified_together(bot, context, mock_classify):
+    bot.queue_user_message(MagicMock(), context, CHAT_ID, "Turn off the lights")
+    bot.queue_user_message(MagicMock(), context, CHAT_ID, "Add a task")
+
+    await asyncio.sleep(0.1)
+
+    mock_classify.assert_awaited_once_with(["Turn off the lights", "Add a task"])
+    assert bot._pending_messages == {}
+    assert bot._debounce_tasks == {}
+
+
+@pytest.mark.asyncio
+async def test_a_new_message_restarts_the_debounce_window(bot, context, mock_classify):
+    bot.queue_user_message(MagicMock(), context, CHAT_ID, "Turn off the lights")
+    await asyncio.sleep(0.03)
+    bot.queue_user_message(MagicMock(), context, CHAT_ID, "Add a task")
+    await asyncio.sleep(0.03)
+
+    # 0.06s after the first message, but only 0.03s after the second
+    mock_classify.assert_not_awaited()
+
+    await asyncio.sleep(0.05)
+
+    mock_classify.assert_awaited_once_with(["Turn off the lights", "Add a task"])
+
+
+@pytest.mark.asyncio
+async def test_batch_results_are_handled_in_message_order(bot, context, mock_classify):
+    outputs = [
+        OrchestratorOutputSchema(tool_name="Home Assistant Tool"),
+        OrchestratorOutputSchema(tool_name="Vikunja Tool"),
+    ]
+    mock_classify.side_effect = None
+    mock_classify.return_value = outputs
+    updates = [MagicMock(), MagicMock()]
+
+    bot.queue_user_message(updates[0], context, CHAT_ID, "Turn off the lights")
+    bot.queue_user_message(updates[1], context, CHAT_ID, "Add a task")
+    await asyncio.sleep(0.1)
+
+    calls = [call.args[:4] for call in bot.handle_user_message.await_args_list]
+    assert calls == [
+        (updates[0], context, "Turn off the lights", outputs[0]),
+        (updates[1], context, "Add a task", outputs[1]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_worker_resolves_each_callers_future(bot):
+    bot.transcriber.transcribe = AsyncMock(side_effect=lambda voice_data: voice_data.decode().upper())
+    worker = asyncio.create_task(bot.transcription_worker())
+    try:
+        texts = await asyncio.gather(bot.transcribe(b"hello"), bot.transcribe(b"there"))
+    finally:
+        worker.cancel()
+
+    assert texts == ["HELLO", "THERE"]
+    assert bot.transcriber.transcribe.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_worker_propagates_a_failure_to_its_callers_future_only(bot):
+    async def transcribe(voice_data):
+        if voice_data == b"broken":
+            raise RuntimeError("Whisper is down")
+        return "fine"
+
+    bot.transcriber.transcribe = AsyncMock(side_effect=transcribe)
+    worker = asyncio.create_task(bot.transcription_worker())
+    try:
+        results = await asyncio.gather(bot.transcribe(b"broken"), bot.transcribe(b"ok"), return_exceptions=True)
+    finally:
+        worker.cancel()
+
+    assert isinstance(results[0], RuntimeError)
+    assert results[1] == "fine"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
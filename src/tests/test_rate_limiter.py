@@ -0,0 +1,97 @@
+import asyncio
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.rate_limiter import TokenBucketRateLimiter  # noqa: E402
+
+
+@pytest.mark.asyncio
+async def test_burst_up_to_max_tokens_is_immediate():
+    limiter = TokenBucketRateLimiter(max_tokens=3, refill_rate=1)
+
+    start = time.monotonic()
+    for _ in range(3):
+        await limiter.acquire()
+
+    assert time.monotonic() - start < 0.05
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_refill_when_empty():
+    limiter = TokenBucketRateLimiter(max_tokens=1, refill_rate=10)
+    await limiter.acquire()
+
+    start = time.monotonic()
+    await limiter.acquire()
+
+    # One token refills in 1 / refill_rate = 0.1s
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_tokens_never_exceed_max_tokens():
+    limiter = TokenBucketRateLimiter(max_tokens=2, refill_rate=1000)
+    await asyncio.sleep(0.01)  # would refill far more than max_tokens
+
+    limiter._refill()
+
+    assert limiter._tokens == 2
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_arrival_order():
+    limiter = TokenBucketRateLimiter(max_tokens=1, refill_rate=50)
+    order = []
+
+    async def request(i):
+        await limiter.acquire()
+        order.append(i)
+
+    tasks = []
+    for i in range(4):
+        tasks.append(asyncio.create_task(request(i)))
+        await asyncio.sleep(0)  # let each task queue up before starting the next
+    await asyncio.gather(*tasks)
+
+    assert order == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_caps_requests_in_flight():
+    limiter = TokenBucketRateLimiter(max_tokens=10, refill_rate=10, concurrency_limit=2)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def request():
+        nonlocal in_flight, max_in_flight
+        async with limiter:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+
+    await asyncio.gather(*(request() for _ in range(5)))
+
+    assert max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_acquire_releases_the_concurrency_slot():
+    limiter = TokenBucketRateLimiter(max_tokens=1, refill_rate=0.01, concurrency_limit=1)
+    await limiter.acquire()  # empty the bucket, the next acquire waits ~100s
+
+    task = asyncio.create_task(limiter.__aenter__())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert not limiter._semaphore.locked()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
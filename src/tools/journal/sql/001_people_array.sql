@@ -0,0 +1,7 @@
+-- Store the people of a journal entry as a text[] instead of a '; '-separated string,
+-- so a person can be toggled with a single UPDATE ... RETURNING.
+ALTER TABLE journal
+    ALTER COLUMN people TYPE text[]
+    USING CASE WHEN people IS NULL OR people = '' THEN '{}'::text[] ELSE string_to_array(people, '; ') END;
+
+ALTER TABLE journal ALTER COLUMN people SET DEFAULT '{}';
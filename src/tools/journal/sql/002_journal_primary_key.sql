@@ -0,0 +1,12 @@
+-- Make id the journal's primary key, if it isn't already. Its B-tree index keeps the per-entry
+-- lookups and updates O(log n) as the table grows, and the mood UPSERT's ON CONFLICT (id)
+-- needs a unique constraint on id to work at all.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'journal'::regclass AND contype = 'p'
+    ) THEN
+        ALTER TABLE journal ADD PRIMARY KEY (id);
+    END IF;
+END$$;
@@ -0,0 +1,12 @@
+-- Toggle a person in a journal entry's people array server-side, returning the updated array
+-- (NULL if the entry doesn't exist). The function body is planned once per backend.
+CREATE OR REPLACE FUNCTION journal_toggle_person(jid text, p text)
+RETURNS text[] LANGUAGE plpgsql AS $$
+DECLARE r text[];
+BEGIN
+    UPDATE journal SET people =
+        CASE WHEN p = ANY(people) THEN array_remove(people, p)
+             ELSE array_append(people, p) END
+    WHERE id = jid RETURNING people INTO r;
+    RETURN r;
+END$$;
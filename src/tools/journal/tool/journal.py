@@ -1,7 +1,10 @@
 
-from datetime import datetime
+import asyncio
+from datetime import date, datetime
+from functools import lru_cache
 import os
-from typing import Any, Dict
+import time
+from typing import Any, Dict, FrozenSet, Optional, Tuple
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes, MessageHandler, filters, Defaults
 from src.config import Config
@@ -9,6 +12,49 @@ from src.logger import logger
 from src.tools.journal.tool.postgres_db import PostgresDB
 
 
+MOODS = ("😭", "😢", "😐", "🙂", "🤩")
+
+# (date ordinal, journal ID) of the last formatted day
+_JOURNAL_ID_CACHE: Tuple[int, str] = (0, "")
+
+
+def today_journal_id() -> str:
+    """Returns today's journal ID, formatting it only once per day."""
+    global _JOURNAL_ID_CACHE
+    today = date.today()
+    if today.toordinal() != _JOURNAL_ID_CACHE[0]:
+        _JOURNAL_ID_CACHE = (today.toordinal(), today.strftime('%d%m%Y'))
+    return _JOURNAL_ID_CACHE[1]
+
+
+# The keyboards only vary with the journal ID, which changes once a day,
+# so the markup is built once per day instead of on every button press
+@lru_cache(maxsize=2)
+def build_mood_keyboard(journal_id: str) -> InlineKeyboardMarkup:
+    """Builds the mood selection keyboard for a journal entry."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(mood, callback_data=f"mood;{value};{journal_id}") for value, mood in enumerate(MOODS, start=1)]
+    ])
+
+
+# Keyed on the people as well, so a refreshed people list gets a new keyboard
+@lru_cache(maxsize=4)
+def build_people_keyboard(people: Tuple[str, ...], people_titles: Tuple[str, ...], journal_id: str) -> InlineKeyboardMarkup:
+    """Builds the people selection keyboard for a journal entry."""
+    people_rows = []
+    max_buttons_per_row = 4
+    for i in range(0, len(people), max_buttons_per_row):
+        row_slice = zip(people[i:i + max_buttons_per_row], people_titles[i:i + max_buttons_per_row])
+        # Include the journal ID in the callback data
+        buttons = [InlineKeyboardButton(title, callback_data=f"person;{person};{journal_id}") for person, title in row_slice]
+        people_rows.append(buttons)
+
+    # Add the 'Done' button with the journal ID
+    people_rows.append([InlineKeyboardButton("Done", callback_data=f"done_people;done_people;{journal_id}")])
+
+    return InlineKeyboardMarkup(people_rows)
+
+
 class Journal:
     """
     Manages the bot's journal functionality, including handling user input,
@@ -17,53 +63,40 @@ class Journal:
     def __init__(self, db: PostgresDB):
         self.db = db
         self.journal_table = "journal"
-        self.people = self.db.get_all_people()
+        # Filled by load_people() once the database pool is open
+        self.people: Tuple[str, ...] = ()  # in keyboard order
+        self.people_titles: Tuple[str, ...] = ()  # button labels, same order as self.people
+        self.people_set: FrozenSet[str] = frozenset()  # membership checks on callbacks
+        self._people_fetched_at: Optional[float] = None  # monotonic time of the last fetch, None before the first
+
+    async def load_people(self, force: bool = False):
+        """
+        Loads the people offered in the journal keyboard.
+        The list changes rarely, so it is only refetched once JOURNAL_PEOPLE_TTL has expired.
+        """
+        fetched = self._people_fetched_at is not None
+        if not force and fetched and time.monotonic() - self._people_fetched_at < Config.JOURNAL_PEOPLE_TTL:
+            return
+        self.people = tuple(await self.db.get_all_people())
+        self.people_titles = tuple(person.title() for person in self.people)
+        self.people_set = frozenset(self.people)
+        self._people_fetched_at = time.monotonic()
 
     def get_people_keyboard_with_id(self, journal_id: str) -> InlineKeyboardMarkup:
         """Generates an inline keyboard for selecting people, including the journal ID."""
-        people_rows = []
-        max_buttons_per_row = 4
-        for i in range(0, len(self.people), max_buttons_per_row):
-            row_slice = self.people[i:i + max_buttons_per_row]
-            # Include the journal ID in the callback data
-            buttons = [InlineKeyboardButton(person.title(), callback_data=f"person;{person};{journal_id}") for person in row_slice]
-            people_rows.append(buttons)
-        
-        # Add the 'Done' button with the journal ID
-        people_rows.append([InlineKeyboardButton("Done", callback_data=f"done_people;done_people;{journal_id}")])
-        
-        return InlineKeyboardMarkup(people_rows)
+        return build_people_keyboard(self.people, self.people_titles, journal_id)
 
     async def handle_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handles the initial /journal command."""
         chat_id = Config.MY_CHAT_ID
-        journal_id = datetime.now().strftime('%d%m%Y')
+        journal_id = today_journal_id()
+        await self.load_people()
 
-        # Check if today's entry already exists
-        today_entry = self.db.select_row_by_id(self.journal_table, journal_id)
-        if not today_entry:
-            # Initialize a new journal entry for the day
-            self.db.insert_row(self.journal_table, {
-                'id': journal_id,
-                'date': datetime.now().isoformat(),
-                'mood': 0,
-                'people': '',
-                'notes': ''
-            })
+        # Today's entry is created by the mood selection, there's nothing to write yet
 
         # Ask the user for their mood with inline buttons
-        inline_keyboard = [
-            [
-                {"text": "😭", "callback_data": f"mood;1;{journal_id}"},
-                {"text": "😢", "callback_data": f"mood;2;{journal_id}"},
-                {"text": "😐", "callback_data": f"mood;3;{journal_id}"},
-                {"text": "🙂", "callback_data": f"mood;4;{journal_id}"},
-                {"text": "🤩", "callback_data": f"mood;5;{journal_id}"}
-            ]
-        ]
-        # Using reply_markup with a list of lists of InlineKeyboardButton objects
-        reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton(btn['text'], callback_data=btn['callback_data']) for btn in row] for row in inline_keyboard])
-        
+        reply_markup = build_mood_keyboard(journal_id)
+
         await context.bot.send_message(chat_id=chat_id, text="How are you feeling today?", reply_markup=reply_markup)
 
     async def handle_callback_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -82,9 +115,16 @@ class Journal:
 
         # Logic based on the n8n flow's "Switch1" node
         if data_type == 'mood':
-            # Mood selection: update mood column and proceed to ask about people
+            # Mood selection: create today's entry, or only update its mood if /journal
+            # was run before today, and proceed to ask about people
             mood_value = int(callback_value)
-            self.db.update_row(self.journal_table, journal_id, {'mood': mood_value})
+            await self.db.upsert_row(self.journal_table, {
+                'id': journal_id,
+                'date': datetime.now().isoformat(),
+                'mood': mood_value,
+                'people': [],
+                'notes': ''
+            }, update_columns=('mood',))
             
             # The people keyboard also needs to send the journal_id
             updated_people_keyboard = self.get_people_keyboard_with_id(journal_id)
@@ -119,31 +159,17 @@ class Journal:
             )
 
         elif data_type == 'person':
-            # Add person to the people column
-            current_entry = self.db.select_row_by_id(self.journal_table, journal_id)
-            current_people_str = current_entry.get('people', '')
-            # Split the string into a list of people.
-            current_people_list = [p.strip() for p in current_people_str.split('; ') if p.strip()]
-    
-            # Check if done people is selected
-            if callback_value == 'done_people':
-                logger.info(f"User has finished selecting people for journal entry {journal_id} with the following people: {current_people_list}")
-
-            # Check if the person is already in the list.
-            if callback_value in current_people_list:
-                # If the person is found, remove them.
-                current_people_list.remove(callback_value)
-                logger.info(f"Removed {callback_value} from the list.")
-            else:
-                # If the person is not found, add them to the list.
-                current_people_list.append(callback_value)
-                logger.info(f"Added {callback_value} to the list.")
-
-            # Join the updated list back into a semicolon-separated string.
-            new_people_str = '; '.join(current_people_list)
-            
-            # Update the 'people' column in the database with the new string.
-            self.db.update_row(self.journal_table, journal_id, {'people': new_people_str})
+            # Buttons from an old keyboard can name someone no longer in the people table
+            if callback_value not in self.people_set:
+                logger.warning(f"Ignoring unknown person '{callback_value}' for journal entry {journal_id}")
+                return
+
+            # Toggle the person in the people array in a single round-trip
+            current_people_list = await self.db.toggle_person(journal_id, callback_value)
+            if current_people_list is None:
+                logger.error(f"Journal entry {journal_id} not found, can't update its people")
+                return
+            logger.info(f"Toggled {callback_value}, people for journal entry {journal_id}: {current_people_list}")
 
             # Prepare the text for the updated message.
             # Check if there are any people currently selected.
@@ -156,6 +182,10 @@ class Journal:
             # The people keyboard also needs to send the journal_id
             updated_people_keyboard = self.get_people_keyboard_with_id(journal_id)
 
+            # Telegram rejects edits that change nothing, don't spend a round-trip on one
+            if new_message_text == query.message.text and updated_people_keyboard == query.message.reply_markup:
+                return
+
             # Edit the message to show the updated selection and the keyboard.
             await context.bot.edit_message_text(
                 chat_id=chat_id,
@@ -170,10 +200,14 @@ class Journal:
         text = message.text
         # Check if the message is a reply to the 'notes' message
         if message.reply_to_message and "Add a note by replying" in message.reply_to_message.text:
-            journal_id = datetime.now().strftime('%d%m%Y')
-            self.db.update_row(self.journal_table, journal_id, {'notes': text})
-            # Final flow
-            await context.bot.send_message(chat_id=message.chat_id, text="Note added. Journal entry complete.")
-            # Delete the original "Add a note" message
-            await context.bot.delete_message(chat_id=message.chat_id, message_id=message.reply_to_message.message_id)
-            await context.bot.delete_message(chat_id=message.chat_id, message_id=message.message_id)
+            journal_id = today_journal_id()
+            # Saved first: the reply deleted below is the only other copy of the note
+            await self.db.update_row(self.journal_table, journal_id, {'notes': text})
+            # The Telegram calls don't depend on each other, run them concurrently
+            await asyncio.gather(
+                # Final flow
+                context.bot.send_message(chat_id=message.chat_id, text="Note added. Journal entry complete."),
+                # Delete the original "Add a note" message and the reply
+                context.bot.delete_message(chat_id=message.chat_id, message_id=message.reply_to_message.message_id),
+                context.bot.delete_message(chat_id=message.chat_id, message_id=message.message_id),
+            )
@@ -1,111 +1,187 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from psycopg import AsyncConnection
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from src.logger import logger
 
-from typing import Any, Dict, List, Optional
-import psycopg2
+
+# The statements are built once per table and column set, so each call sends byte-identical
+# SQL: no per-call formatting, and the server-side prepared statement cache gets hits
+@lru_cache(maxsize=None)
+def _select_by_id_sql(table: str, columns: Tuple[str, ...]) -> str:
+    return f"SELECT {', '.join(columns)} FROM {table} WHERE id = %s"
+
+
+@lru_cache(maxsize=None)
+def _insert_sql(table: str, columns: Tuple[str, ...]) -> str:
+    placeholders = ', '.join(['%s'] * len(columns))
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+@lru_cache(maxsize=None)
+def _upsert_sql(table: str, columns: Tuple[str, ...], update_columns: Tuple[str, ...]) -> str:
+    update_clause = ', '.join([f"{column} = EXCLUDED.{column}" for column in update_columns])
+    return f"{_insert_sql(table, columns)} ON CONFLICT (id) DO UPDATE SET {update_clause}"
+
+
+@lru_cache(maxsize=None)
+def _update_sql(table: str, columns: Tuple[str, ...], returning: bool = False) -> str:
+    set_clause = ', '.join([f"{column} = %s" for column in columns])
+    query = f"UPDATE {table} SET {set_clause} WHERE id = %s"
+    return f"{query} RETURNING *" if returning else query
 
 
 class PostgresDB:
     """
     A class to handle communication with a PostgreSQL database.
-    It encapsulates the connection, cursor, and common database operations.
+    It encapsulates a pool of async connections and common database operations,
+    so queries don't block the event loop and concurrent handlers don't serialize
+    on a single connection.
     """
-    def __init__(self, db_name, user, password, host, port):
+    def __init__(self, db_name, user, password, host, port, min_size: int = 1, max_size: int = 8, prepare_statements: bool = True):
+        """
+        Args:
+            prepare_statements (bool): Keep server-side prepared statements for the hot journal queries.
+                Must be disabled behind a transaction-pooling pgbouncer, where a statement
+                prepared on one server connection can't be executed on another.
+        """
         self.db_name = db_name
         self.user = user
         self.password = password
         self.host = host
         self.port = port
-        self.conn = None
-        self.cursor = None
+        # Opened by connect(), which needs a running event loop
+        self.pool = AsyncConnectionPool(
+            make_conninfo(dbname=db_name, user=user, password=password, host=host, port=port),
+            min_size=min_size,
+            max_size=max_size,
+            # A None threshold turns prepared statements off entirely, even for prepare=True
+            kwargs={} if prepare_statements else {"prepare_threshold": None},
+            configure=self._configure_connection,
+            open=False,
+        )
 
-    def connect(self):
-        """Establishes a connection to the PostgreSQL database."""
-        try:
-            self.conn = psycopg2.connect(
-                dbname=self.db_name,
-                user=self.user,
-                password=self.password,
-                host=self.host,
-                port=self.port
-            )
-            self.cursor = self.conn.cursor()
-            print("Database connection successful.")
-        except Exception as e:
-            print(f"Error connecting to the database: {e}")
-
-    def disconnect(self):
-        """Closes the database connection."""
-        if self.cursor:
-            self.cursor.close()
-        if self.conn:
-            self.conn.close()
-            print("Database connection closed.")
-
-    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[tuple]:
-        """Executes a SQL query and returns the results."""
-        if not self.conn or self.conn.closed:
-            self.connect()
+    @staticmethod
+    async def _configure_connection(conn: AsyncConnection):
+        # Each connection keeps an LRU of up to 128 prepared statements, keyed by the SQL text
+        conn.prepared_max = 128
+
+    async def connect(self):
+        """
+        Opens the connection pool, raising if the database can't be reached.
+        A pool that failed to open is closed and can't be used, so there's nothing to run on without it.
+        """
         try:
-            self.cursor.execute(query, params)
-            if query.strip().lower().startswith(('select', 'returning')):
-                return self.cursor.fetchall()
-            else:
-                self.conn.commit()
-                return []
-        except Exception as e:
-            self.conn.rollback()
-            print(f"Error executing query: {e}")
-            return []
-
-    def select_row_by_id(self, table: str, row_id: str) -> Optional[Dict[str, Any]]:
+            await self.pool.open(wait=True)
+        except Exception:
+            logger.exception("Error connecting to the database")
+            raise
+        logger.info("Database connection successful.")
+
+    async def disconnect(self):
+        """Closes the connection pool."""
+        await self.pool.close()
+        logger.info("Database connection closed.")
+
+    # Query errors are not caught here: they propagate, with their traceback, to the handler
+    # that issued the query and from there to the application's error handler.
+    # prepare follows psycopg: True prepares the statement on first use, False never does,
+    # None prepares it once it has run prepare_threshold times on the connection
+
+    async def fetch(self, query: str, params: Optional[tuple] = None, prepare: Optional[bool] = None) -> List[tuple]:
+        """Runs a query and returns all the rows it produced."""
+        async with self.pool.connection() as conn:
+            cursor = await conn.execute(query, params, prepare=prepare)
+            return await cursor.fetchall()
+
+    async def fetchrow(self, query: str, params: Optional[tuple] = None, prepare: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """Runs a query and returns its first row as a dictionary, or None."""
+        async with self.pool.connection() as conn:
+            cursor = await conn.cursor(row_factory=dict_row).execute(query, params, prepare=prepare)
+            return await cursor.fetchone()
+
+    async def execute(self, query: str, params: Optional[tuple] = None, prepare: Optional[bool] = None):
+        """Runs a statement, committing it when the connection goes back to the pool."""
+        async with self.pool.connection() as conn:
+            await conn.execute(query, params, prepare=prepare)
+
+    async def execute_query(self, query: str, params: Optional[tuple] = None, prepare: Optional[bool] = None, *, fetch: bool = False) -> List[tuple]:
+        """
+        Executes a SQL query and returns the results.
+        The caller says whether the query produces rows with fetch, statements like
+        WITH ... SELECT or UPDATE ... RETURNING can't be told apart by their first word.
+        """
+        if fetch:
+            return await self.fetch(query, params, prepare)
+        await self.execute(query, params, prepare)
+        return []
+
+    async def select_row_by_id(self, table: str, row_id: str, columns: Tuple[str, ...] = ("*",)) -> Optional[Dict[str, Any]]:
         """
         Selects a row from a table by its 'id' and returns it as a dictionary.
+        Only the given columns are fetched, pass the ones the caller reads.
         This method is a stand-in for the "Select today's row" n8n node.
         """
-        try:
-            self.cursor.execute(f"SELECT * FROM {table} WHERE id = %s", (row_id,))
-            columns = [desc[0] for desc in self.cursor.description]
-            row = self.cursor.fetchone()
-            if row:
-                return dict(zip(columns, row))
-            return None
-        except Exception as e:
-            print(f"Error fetching row: {e}")
-            return None
+        return await self.fetchrow(_select_by_id_sql(table, columns), (row_id,), prepare=True)
 
-    def insert_row(self, table: str, data: Dict[str, Any]):
+    async def insert_row(self, table: str, data: Dict[str, Any]):
         """Inserts a new row into the table."""
-        columns = ', '.join(data.keys())
-        placeholders = ', '.join(['%s'] * len(data))
-        query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
-        self.execute_query(query, tuple(data.values()))
-
-    def update_row(self, table: str, row_id: str, data: Dict[str, Any]):
-        """Updates an existing row in the table."""
-        set_clause = ', '.join([f"{key} = %s" for key in data.keys()])
-        query = f"UPDATE {table} SET {set_clause} WHERE id = %s"
+        await self.execute_query(_insert_sql(table, tuple(data)), tuple(data.values()))
+
+    async def upsert_row(self, table: str, data: Dict[str, Any], update_columns: Tuple[str, ...]):
+        """
+        Inserts a new row into the table, or, if a row with the same 'id' exists,
+        updates only its update_columns from data, in a single statement.
+        """
+        await self.execute_query(_upsert_sql(table, tuple(data), update_columns), tuple(data.values()), prepare=True)
+
+    async def update_row(self, table: str, row_id: str, data: Dict[str, Any], returning: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Updates an existing row in the table.
+        With returning, the updated row is returned as a dictionary (None if it doesn't exist),
+        so a caller needing the new state doesn't have to select it again.
+        """
         params = list(data.values()) + [row_id]
-        self.execute_query(query, tuple(params))
+        if not returning:
+            await self.execute_query(_update_sql(table, tuple(data)), tuple(params), prepare=True)
+            return None
+        return await self.fetchrow(_update_sql(table, tuple(data), returning=True), tuple(params), prepare=True)
 
-    def get_all_people(self) -> List[str]:
+    async def toggle_person(self, journal_id: str, person: str) -> Optional[List[str]]:
+        """
+        Removes person from a journal entry's people if present, appends it otherwise,
+        through the journal_toggle_person function (sql/003_journal_toggle_person.sql).
+        Returns the updated people, or None if the entry doesn't exist.
+        """
+        rows = await self.fetch("SELECT journal_toggle_person(%s, %s)", (journal_id, person), prepare=True)
+        return rows[0][0] if rows else None
+
+    async def get_all_people(self) -> List[str]:
         """Retrieves all people from the 'people' table."""
         query = "SELECT * FROM people"
-        people = self.execute_query(query)
+        people = await self.execute_query(query, fetch=True)
         people_names = [person[1].lower() for person in people]
         return people_names
 
 
 if __name__ == "__main__":
+    import asyncio
     from src.config import Config
 
-    db = PostgresDB(
-        db_name=Config.POSTGRES_DB_NAME,
-        user=Config.POSTGRES_DB_USER,
-        password=Config.POSTGRES_DB_PASSWORD,
-        host=Config.POSTGRES_DB_HOST,
-        port=Config.POSTGRES_DB_PORT
-    )
-    db.connect()
-    print(db.select_row_by_id("journal", "17082025"))
-    people = db.get_all_people()
-    print(people)
-    db.disconnect()
\ No newline at end of file
+    async def main():
+        db = PostgresDB(
+            db_name=Config.POSTGRES_DB_NAME,
+            user=Config.POSTGRES_DB_USER,
+            password=Config.POSTGRES_DB_PASSWORD,
+            host=Config.POSTGRES_DB_HOST,
+            port=Config.POSTGRES_DB_PORT
+        )
+        await db.connect()
+        print(await db.select_row_by_id("journal", "17082025"))
+        people = await db.get_all_people()
+        print(people)
+        await db.disconnect()
+
+    asyncio.run(main())
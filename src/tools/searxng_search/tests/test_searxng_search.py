@@ -7,6 +7,7 @@ from aiohttp import ClientSession
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from tool.searxng_search import (  # noqa: E402
+    SearXNGSearchResultItemSchema,
     SearXNGSearchTool,
     SearXNGSearchToolInputSchema,
     SearXNGSearchToolOutputSchema,
@@ -266,5 +267,51 @@ async def test_searxng_search_tool_error(mock_aiohttp_session):
     assert "Failed to fetch search results" in str(excinfo.value)
 
 
+
+@pytest.mark.asyncio
+async def test_searxng_search_tool_uses_session_factory(mock_aiohttp_session):
+    mock_searxng_url = "https://searxng.example.com"
+    mock_query = "shared session query"
+    mock_response_data = {
+        "results": [
+            {"title": "Shared Session Result", "url": "https://example.com/shared", "content": "Shared content", "query": mock_query}
+        ]
+    }
+
+    # Create a mock response object on a long-lived session
+    mock_response = AsyncMock()
+    mock_response.status = 200
+    mock_response.json.return_value = mock_response_data
+    shared_session = MagicMock(spec=ClientSession)
+    shared_session.get.return_value.__aenter__.return_value = mock_response
+
+    # Initialize the tool with a session factory
+    searxng_tool = SearXNGSearchTool(
+        SearXNGSearchToolConfig(base_url=mock_searxng_url),
+        session_factory=lambda: shared_session,
+    )
+    input_schema = SearXNGSearchToolInputSchema(queries=[mock_query, "second query"], category=None)
+
+    # Run the tool
+    result = await searxng_tool.run_async(input_schema)
+
+    # The shared session serves every query and no session of its own is opened or closed
+    assert len(result.results) == 1
+    assert result.results[0].title == "Shared Session Result"
+    assert shared_session.get.call_count == 2
+    mock_aiohttp_session.get.assert_not_called()
+    shared_session.close.assert_not_called()
+
+
+def test_searxng_search_tool_format_results():
+    searxng_tool = SearXNGSearchTool(SearXNGSearchToolConfig(base_url="https://searxng.example.com"))
+    results = [
+        SearXNGSearchResultItemSchema(title="First", url="https://example.com/1", content="One", query="q"),
+        SearXNGSearchResultItemSchema(title="Second", url="https://example.com/2", content="Two", query="q"),
+    ]
+
+    assert searxng_tool.format_results(results) == "First (https://example.com/1)\nOne\n\nSecond (https://example.com/2)\nTwo"
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -1,5 +1,5 @@
 import os
-from typing import List, Literal, Optional
+from typing import Callable, List, Literal, Optional
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from src.config import Config
@@ -63,17 +63,24 @@ class SearXNGSearchTool(BaseTool[SearXNGSearchToolInputSchema, SearXNGSearchTool
         base_url (str): The base URL for the SearXNG instance to use.
     """
 
-    def __init__(self, config: SearXNGSearchToolConfig = SearXNGSearchToolConfig()):
+    def __init__(
+        self,
+        config: SearXNGSearchToolConfig = SearXNGSearchToolConfig(),
+        session_factory: Optional[Callable[[], aiohttp.ClientSession]] = None,
+    ):
         """
         Initializes the SearXNGTool.
 
         Args:
             config (SearXNGSearchToolConfig):
                 Configuration for the tool, including base URL, max results, and optional title and description overrides.
+            session_factory (Optional[Callable[[], aiohttp.ClientSession]]):
+                Returns a long-lived session to run the searches on. If not set, each run opens its own session.
         """
         super().__init__(config)
         self.base_url = config.base_url
         self.max_results = config.max_results
+        self.session_factory = session_factory
 
     async def _fetch_search_results(self, session: aiohttp.ClientSession, query: str, category: Optional[str]) -> List[dict]:
         """
@@ -113,9 +120,10 @@ class SearXNGSearchTool(BaseTool[SearXNGSearchToolInputSchema, SearXNGSearchTool
 
             return results
 
-    async def format_results(self, results: List[SearXNGSearchResultItemSchema]) -> str:
+    def format_results(self, results: List[SearXNGSearchResultItemSchema]) -> str:
         """
         Formats the search results into a string.
+        This is a single join over at most max_results items, cheap enough to run on the event loop.
 
         Args:
             results (List[dict]): The list of search results.
@@ -123,13 +131,7 @@ class SearXNGSearchTool(BaseTool[SearXNGSearchToolInputSchema, SearXNGSearchTool
         Returns:
             str: The formatted search results.
         """
-        formatted_results = []
-        for result in results:
-            formatted_result = f"{result.title} ({result.url})"
-            formatted_result += f"\n{result.content}"
-            formatted_results.append(formatted_result)
-
-        return "\n\n".join(formatted_results)
+        return "\n\n".join(f"{result.title} ({result.url})\n{result.content}" for result in results)
 
     async def run_async(
         self, params: SearXNGSearchToolInputSchema, max_results: Optional[int] = None
@@ -148,9 +150,13 @@ class SearXNGSearchTool(BaseTool[SearXNGSearchToolInputSchema, SearXNGSearchTool
             ValueError: If the base URL is not provided.
             Exception: If the request to SearXNG fails.
         """
-        async with aiohttp.ClientSession() as session:
-            tasks = [self._fetch_search_results(session, query, params.category) for query in params.queries]
-            results = await asyncio.gather(*tasks)
+        if self.session_factory:
+            session = self.session_factory()
+            results = await asyncio.gather(*[self._fetch_search_results(session, query, params.category) for query in params.queries])
+        else:
+            async with aiohttp.ClientSession() as session:
+                tasks = [self._fetch_search_results(session, query, params.category) for query in params.queries]
+                results = await asyncio.gather(*tasks)
 
         all_results = [item for sublist in results for item in sublist]
 
@@ -1,6 +1,8 @@
 import os
-from openai import OpenAI
-import io
+from typing import BinaryIO, Optional, Union
+from openai import AsyncOpenAI
+from src.logger import logger
+from src.rate_limiter import TokenBucketRateLimiter
 
 
 class OpenAITranscriber:
@@ -8,7 +10,7 @@ class OpenAITranscriber:
     A class to handle audio transcription using the OpenAI Whisper API via the OpenAI Python SDK.
     """
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, requests_per_minute: int = 50, concurrency_limit: int = 4):
         """
         Initializes the transcriber with an OpenAI API key.
 
@@ -16,44 +18,67 @@ class OpenAITranscriber:
             api_key (str): The API key for authenticating with OpenAI.
                            If not provided, it will attempt to read from
                            the environment variable 'OPENAI_API_KEY'.
+            requests_per_minute (int): Transcription requests allowed per minute, match the account's tier.
+            concurrency_limit (int): Maximum number of transcriptions in flight at once.
         """
         api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OpenAI API key is not set. Please provide it or set the 'OPENAI_API_KEY' environment variable.")
 
-        # Initialize the OpenAI client
-        self.client = OpenAI(api_key=api_key)
+        # Initialize the OpenAI client, async so a transcription doesn't block the event loop
+        self.client = AsyncOpenAI(api_key=api_key)
+        # Paces requests under the API's rate limit rather than running into 429 back-off
+        self.limiter = TokenBucketRateLimiter(
+            max_tokens=max(1, requests_per_minute // 60),
+            refill_rate=requests_per_minute / 60,
+            concurrency_limit=concurrency_limit,
+        )
 
-    def transcribe(self, audio_file: bytearray, model: str = "gpt-4o-transcribe", language: str = None) -> str:
+    async def close(self):
+        """Closes the client's pooled connections."""
+        await self.client.close()
+
+    async def transcribe(self, audio_file: Union[bytes, BinaryIO], model: str = "gpt-4o-transcribe", language: str = None) -> Optional[str]:
         """
         Transcribes an audio file into text using the OpenAI Whisper model.
 
         Args:
-            audio_file (bytearray): Raw audio bytes (e.g. from Telegram download).
+            audio_file (Union[bytes, BinaryIO]): Raw audio bytes (e.g. from Telegram download),
+                or an already opened binary stream positioned at the start of the audio.
             model (str): Whisper model to use (default: "gpt-4o-transcribe").
             language (str): Optional language hint (e.g., "en", "it", "es").
 
         Returns:
-            str: The transcribed text.
+            Optional[str]: The transcribed text, or None if the transcription failed.
         """
         try:
-            # Wrap bytearray into a file-like object
-            audio_io = io.BytesIO(audio_file)
-            audio_io.name = "voice.ogg"  # give it a name so OpenAI knows the format
-
-            transcription = self.client.audio.transcriptions.create(
-                model=model,
-                file=audio_io,
-                language=language
-            )
+            if isinstance(audio_file, bytes):
+                # Raw bytes go to the upload as a (filename, content) tuple without a copy,
+                # wrapping them in a BytesIO would only have the SDK read them back out.
+                # The filename tells OpenAI the format
+                file = ("voice.ogg", audio_file)
+            else:
+                file = audio_file
+                if not getattr(file, "name", None):
+                    file.name = "voice.ogg"  # give it a name so OpenAI knows the format
+
+            async with self.limiter:
+                transcription = await self.client.audio.transcriptions.create(
+                    model=model,
+                    file=file,
+                    language=language
+                )
             return transcription.text
-        except Exception as err:
-            print(f"Error during transcription: {err}")
-            return "Error: Could not transcribe audio."
+        except Exception:
+            logger.exception("Error during transcription")
+            return None
 
 
 if __name__ == "__main__":
+    import asyncio
+
     # Example usage
     transcriber = OpenAITranscriber()
-    text = transcriber.transcribe("example_audio.mp3", language="en")
+    with open("example_audio.mp3", "rb") as audio:
+        text = asyncio.run(transcriber.transcribe(audio, language="en"))
     print("Transcription:", text)